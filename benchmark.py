@@ -0,0 +1,303 @@
+import sys
+import os
+import re
+import json
+import time
+import random
+import shutil
+import zipfile
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from updater_core import UpdaterCore
+
+PHASES = ("get_online_version", "download_zip", "extract_zip", "cleanup_old_files")
+
+class Throttle:
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, bytes_per_second) -> None:
+        self.bytes_per_second = bytes_per_second
+        self.lock = threading.Lock()
+        self.next_send = time.monotonic()
+
+    def wait(self, size) -> None:
+        if not self.bytes_per_second:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_send)
+            self.next_send = start + size / self.bytes_per_second
+        if start > now:
+            time.sleep(start - now)
+
+class ReleaseHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    root = ""
+    latency = 0.0
+    throttle = Throttle(0)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        self.serve(send_body=False)
+
+    def do_GET(self) -> None:
+        self.serve(send_body=True)
+
+    def serve(self, send_body) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        path = os.path.join(self.root, self.path.split('?', 1)[0].lstrip('/'))
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        st = os.stat(path)
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+        start, end = 0, st.st_size - 1
+        status = 200
+        match = re.fullmatch(r'bytes=(\d*)-(\d*)', self.headers.get('Range', ''))
+        if match and self.headers.get('If-Range', etag) == etag and st.st_size:
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), end) if match.group(2) else end
+            else:
+                start = max(0, st.st_size - int(match.group(2)))
+            if start > end:
+                self.send_error(416)
+                return
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{st.st_size}")
+        self.end_headers()
+        if not send_body:
+            return
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(Throttle.CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.throttle.wait(len(chunk))
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+class Scenario:
+    def __init__(self, name, files, install="empty", changed_ratio=1.0, preserved_files=0, orphan_files=0) -> None:
+        self.name = name
+        self.files = files
+        self.install = install
+        self.changed_ratio = changed_ratio
+        self.preserved_files = preserved_files
+        self.orphan_files = orphan_files
+
+def mixed_files(count, min_size, max_size, folder) -> list:
+    return [(f"{folder}/{i // 50:03d}/file_{i:05d}.dat", (min_size, max_size)) for i in range(count)]
+
+def build_scenarios(scale) -> dict:
+    def count(n):
+        return max(1, int(n * scale))
+    mixed = mixed_files(count(300), 16 * 1024, 2 * 1024 * 1024, "assets")
+    return {scenario.name: scenario for scenario in (
+        Scenario("tiny-files", mixed_files(count(5000), 256, 8 * 1024, "tiny")),
+        Scenario("huge-files", [(f"huge/pack_{i}.pak", (count(64) * 1024 * 1024,) * 2) for i in range(3)]),
+        Scenario("mostly-unchanged", mixed, install="previous", changed_ratio=0.05),
+        Scenario("fully-changed", mixed, install="previous", changed_ratio=1.0),
+        Scenario("preserved-folders", mixed_files(count(200), 1024, 64 * 1024, "assets"), install="previous",
+                 changed_ratio=0.1, preserved_files=count(5000), orphan_files=count(500)),
+    )}
+
+def make_release(scenario, server_root, version, seed) -> dict:
+    rng = random.Random(f"{scenario.name}:{version}:{seed}")
+    contents = {}
+    for rel_path, (min_size, max_size) in scenario.files:
+        contents[rel_path] = rng.randbytes(rng.randint(min_size, max_size))
+    os.makedirs(os.path.join(server_root, "zips"), exist_ok=True)
+    with zipfile.ZipFile(os.path.join(server_root, "zips", f"{version}.zip"), 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zip_ref:
+        for rel_path, data in contents.items():
+            zip_ref.writestr(rel_path, data)
+    with open(os.path.join(server_root, "current_ver.txt"), 'w', encoding='utf-8') as f:
+        f.write(version)
+    return contents
+
+def write_files(target_path, contents) -> None:
+    for rel_path, data in contents.items():
+        path = os.path.join(target_path, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+def prepare_install(scenario, target_path, contents, seed) -> None:
+    shutil.rmtree(target_path, ignore_errors=True)
+    os.makedirs(target_path)
+    if scenario.install == "empty":
+        return
+    rng = random.Random(f"{scenario.name}:install:{seed}")
+    previous = dict(contents)
+    for rel_path in rng.sample(sorted(previous), int(len(previous) * scenario.changed_ratio)):
+        previous[rel_path] = rng.randbytes(len(previous[rel_path]) or 1)
+    for i in range(scenario.orphan_files):
+        previous[f"old/{i // 50:03d}/orphan_{i:05d}.dat"] = rng.randbytes(rng.randint(256, 4096))
+    write_files(target_path, previous)
+    write_files(target_path, {f"Data/{i // 100:03d}/save_{i:05d}.dat": rng.randbytes(rng.randint(256, 4096))
+                              for i in range(scenario.preserved_files)})
+
+def start_server(root, bandwidth=None) -> ThreadingHTTPServer:
+    handler = ReleaseHandler
+    if bandwidth is not None:
+        handler = type("MirrorHandler", (ReleaseHandler,), {"root": root, "throttle": Throttle(bandwidth * 1024 * 1024 / 8)})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_once(scenario, base_urls, target_path, temp_path, workers) -> dict:
+    os.environ['TEMP'] = temp_path
+    shutil.rmtree(os.path.join(temp_path, 'LP_Upd'), ignore_errors=True)
+    core = UpdaterCore(target_path, extract_workers=workers, base_url=base_urls[0], mirrors=base_urls[1:])
+    timings = dict.fromkeys(PHASES, 0.0)
+    cleanup_old_files = core.cleanup_old_files
+
+    def timed_cleanup(*args) -> None:
+        start = time.perf_counter()
+        cleanup_old_files(*args)
+        timings["cleanup_old_files"] += time.perf_counter() - start
+    core.cleanup_old_files = timed_cleanup
+
+    start = time.perf_counter()
+    version = core.get_online_version()
+    timings["get_online_version"] = time.perf_counter() - start
+    if not version:
+        raise Exception("Benchmark server did not return a version.")
+    core.zip_path = os.path.join(core.temp_dir, f'update_{version}.zip')
+    start = time.perf_counter()
+    core.download_zip(version)
+    timings["download_zip"] = time.perf_counter() - start
+    start = time.perf_counter()
+    core.extract_zip()
+    timings["extract_zip"] = time.perf_counter() - start - timings["cleanup_old_files"]
+    core.cleanup()
+    return timings
+
+def run_scenario(scenario, args, work_path) -> dict:
+    server_root = os.path.join(work_path, "server", scenario.name)
+    target_path = os.path.join(work_path, "install", scenario.name)
+    temp_path = os.path.join(work_path, "temp")
+    os.makedirs(temp_path, exist_ok=True)
+    contents = make_release(scenario, server_root, "1.0", args.seed)
+    ReleaseHandler.root = server_root
+    servers = [start_server(server_root)] + [start_server(server_root, bandwidth) for bandwidth in args.mirrors or ()]
+    base_urls = [f"http://127.0.0.1:{server.server_port}" for server in servers]
+    runs = []
+    try:
+        for _ in range(args.repeat):
+            prepare_install(scenario, target_path, contents, args.seed)
+            runs.append(run_once(scenario, base_urls, target_path, temp_path, args.workers))
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+    for rel_path, data in contents.items():
+        with open(os.path.join(target_path, rel_path), 'rb') as f:
+            if f.read() != data:
+                raise Exception(f"{scenario.name}: {rel_path} was not installed correctly.")
+    return {
+        "scenario": scenario.name,
+        "files": len(contents),
+        "bytes": sum(len(data) for data in contents.values()),
+        "archive_bytes": os.path.getsize(os.path.join(server_root, "zips", "1.0.zip")),
+        "median": {phase: statistics.median(run[phase] for run in runs) for phase in PHASES},
+        "runs": runs,
+    }
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_summary(results, baseline=None) -> None:
+    previous = {}
+    if baseline:
+        previous = {result["scenario"]: result["median"] for result in baseline["results"]}
+    for result in results["results"]:
+        print(f"{result['scenario']}: {result['files']} files, {result['bytes'] / (1024*1024):.1f} MB", file=sys.stderr)
+        for phase in PHASES:
+            seconds = result["median"][phase]
+            line = f"  {phase:<20} {seconds * 1000:10.1f} ms"
+            before = previous.get(result["scenario"], {}).get(phase)
+            if before:
+                line += f"  ({(seconds - before) * 100 / before:+.1f}% vs baseline)"
+            print(line, file=sys.stderr)
+
+def parse_args(argv) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="benchmark")
+    parser.add_argument("--scenario", action="append", dest="scenarios")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--latency", type=float, default=0.0, metavar="MS")
+    parser.add_argument("--bandwidth", type=float, default=0.0, metavar="MBPS")
+    parser.add_argument("--mirror", type=float, action="append", dest="mirrors", default=None, metavar="MBPS")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None)
+    parser.add_argument("--work-dir", default=None)
+    return parser.parse_args(argv)
+
+def main(argv) -> int:
+    args = parse_args(argv)
+    scenarios = build_scenarios(args.scale)
+    names = args.scenarios or list(scenarios)
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)} (available: {', '.join(scenarios)})", file=sys.stderr)
+        return 2
+    ReleaseHandler.latency = args.latency / 1000
+    ReleaseHandler.throttle = Throttle(args.bandwidth * 1024 * 1024 / 8)
+    work_path = args.work_dir or tempfile.mkdtemp(prefix="LP_Bench_")
+    saved_temp = os.environ.get('TEMP')
+    try:
+        results = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {"scale": args.scale, "repeat": args.repeat, "latency_ms": args.latency,
+                         "bandwidth_mbps": args.bandwidth,
+                         "mirrors_mbps": args.mirrors or [], "workers": args.workers, "seed": args.seed},
+            "results": [run_scenario(scenarios[name], args, work_path) for name in names],
+        }
+    finally:
+        if saved_temp is None:
+            os.environ.pop('TEMP', None)
+        else:
+            os.environ['TEMP'] = saved_temp
+        if not args.work_dir:
+            shutil.rmtree(work_path, ignore_errors=True)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_summary(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
\ No newline at end of file
@@ -0,0 +1,201 @@
+import sys
+import zlib
+import struct
+import argparse
+from itertools import accumulate
+
+try:
+    import bsdiff4
+except ImportError:
+    bsdiff4 = None
+
+# LPDELTA1 layout: magic, then a zlib stream of ops until OP_END.
+#   OP_COPY <u64 source offset> <u32 length>   copy bytes from the installed file
+#   OP_ADD  <u32 length> <data>                 literal bytes
+MAGIC = b'LPDELTA1'
+OP_END = 0
+OP_COPY = 1
+OP_ADD = 2
+COPY_SIZE = 1024 * 1024
+BLOCK_SIZE = 512 # granularity at which create_lpdelta finds unchanged data
+MAX_OP_LENGTH = 0xFFFFFFFF
+
+class PatchError(Exception):
+    pass
+
+class InflateReader:
+    def __init__(self, f) -> None:
+        self.f = f
+        self.decompressor = zlib.decompressobj()
+        self.buffer = b''
+        self.offset = 0
+
+    def read(self, size) -> bytes:
+        while self.offset >= len(self.buffer):
+            data = self.f.read(COPY_SIZE)
+            try:
+                if data:
+                    self.buffer = self.decompressor.decompress(data)
+                else:
+                    self.buffer = self.decompressor.flush()
+            except zlib.error as e:
+                raise PatchError(f"Corrupt patch data: {e}")
+            if not data and not self.buffer:
+                raise PatchError("Patch data ended unexpectedly.")
+            self.offset = 0
+        data = self.buffer[self.offset:self.offset + size]
+        self.offset += len(data)
+        return data
+
+    def read_exact(self, size) -> bytes:
+        parts = []
+        while size > 0:
+            data = self.read(size)
+            parts.append(data)
+            size -= len(data)
+        return b''.join(parts)
+
+class PatchWriter:
+    def __init__(self, f) -> None:
+        self.f = f
+        self.compressor = zlib.compressobj(9)
+        self.copy_offset = 0
+        self.copy_length = 0
+
+    def write(self, data) -> None:
+        self.f.write(self.compressor.compress(data))
+
+    def add(self, data) -> None:
+        if not data:
+            return
+        self.flush_copy()
+        for start in range(0, len(data), MAX_OP_LENGTH):
+            part = data[start:start + MAX_OP_LENGTH]
+            self.write(bytes([OP_ADD]) + struct.pack('<I', len(part)))
+            self.write(part)
+
+    def copy(self, offset, length) -> None:
+        if self.copy_length and self.copy_offset + self.copy_length == offset:
+            self.copy_length += length
+            return
+        self.flush_copy()
+        self.copy_offset = offset
+        self.copy_length = length
+
+    def flush_copy(self) -> None:
+        while self.copy_length:
+            length = min(self.copy_length, MAX_OP_LENGTH)
+            self.write(bytes([OP_COPY]) + struct.pack('<QI', self.copy_offset, length))
+            self.copy_offset += length
+            self.copy_length -= length
+
+    def close(self) -> None:
+        self.flush_copy()
+        self.write(bytes([OP_END]))
+        self.f.write(self.compressor.flush())
+
+def block_hash(data) -> int:
+    # rsync's weak checksum, which can be rolled forward one byte at a time
+    return (sum(data) & 0xffff) | (sum(accumulate(data)) & 0xffff) << 16
+
+def match_length(source, offset, target, position, block_size) -> int:
+    length = block_size
+    limit = min(len(source) - offset, len(target) - position)
+    while length + block_size <= limit and source[offset + length:offset + length + block_size] == target[position + length:position + length + block_size]:
+        length += block_size
+    while length < limit and source[offset + length] == target[position + length]:
+        length += 1
+    return length
+
+def create_lpdelta(source_path, target_path, patch_path, block_size=BLOCK_SIZE) -> None:
+    with open(source_path, 'rb') as f:
+        source = f.read()
+    with open(target_path, 'rb') as f:
+        target = f.read()
+    blocks = {}
+    for offset in range(0, len(source) - block_size + 1, block_size):
+        blocks.setdefault(block_hash(source[offset:offset + block_size]), offset)
+    with open(patch_path, 'wb') as f:
+        f.write(MAGIC)
+        writer = PatchWriter(f)
+        position = 0
+        literal = 0
+        end = len(target) - block_size
+        weak = block_hash(target[:block_size]) if end >= 0 else 0
+        while position <= end:
+            offset = blocks.get(weak)
+            if offset is not None and source[offset:offset + block_size] == target[position:position + block_size]:
+                length = match_length(source, offset, target, position, block_size)
+                writer.add(target[literal:position])
+                writer.copy(offset, length)
+                position += length
+                literal = position
+                if position <= end:
+                    weak = block_hash(target[position:position + block_size])
+                continue
+            if position < end:
+                removed = target[position]
+                a = ((weak & 0xffff) - removed + target[position + block_size]) & 0xffff
+                b = ((weak >> 16) - block_size * removed + a) & 0xffff
+                weak = a | b << 16
+            position += 1
+        writer.add(target[literal:])
+        writer.close()
+
+def supported_formats() -> set:
+    formats = {"lpdelta"}
+    if bsdiff4 is not None:
+        formats.add("bsdiff")
+    return formats
+
+def apply_patch(patch_format, source_path, patch_path, output_path) -> None:
+    if patch_format == "lpdelta":
+        apply_lpdelta(source_path, patch_path, output_path)
+    elif patch_format == "bsdiff" and bsdiff4 is not None:
+        try:
+            bsdiff4.file_patch(source_path, output_path, patch_path)
+        except ValueError as e:
+            raise PatchError(str(e))
+    else:
+        raise PatchError(f"Unsupported patch format: {patch_format}")
+
+def apply_lpdelta(source_path, patch_path, output_path) -> None:
+    with open(patch_path, 'rb') as patch_file:
+        if patch_file.read(len(MAGIC)) != MAGIC:
+            raise PatchError("Not an LPDELTA1 patch.")
+        reader = InflateReader(patch_file)
+        with open(source_path, 'rb') as source, open(output_path, 'wb') as output:
+            while True:
+                op = reader.read_exact(1)[0]
+                if op == OP_END:
+                    return
+                if op == OP_COPY:
+                    offset, length = struct.unpack('<QI', reader.read_exact(12))
+                    source.seek(offset)
+                    while length > 0:
+                        data = source.read(min(COPY_SIZE, length))
+                        if not data:
+                            raise PatchError("Patch copies past the end of the installed file.")
+                        output.write(data)
+                        length -= len(data)
+                elif op == OP_ADD:
+                    (length,) = struct.unpack('<I', reader.read_exact(4))
+                    while length > 0:
+                        data = reader.read(min(COPY_SIZE, length))
+                        output.write(data)
+                        length -= len(data)
+                else:
+                    raise PatchError(f"Unknown patch operation: {op}")
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="Write an LPDELTA1 patch that turns OLD into NEW.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("patch")
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    args = parser.parse_args(argv)
+    create_lpdelta(args.old, args.new, args.patch, args.block_size)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
\ No newline at end of file
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import tempfile
+import shutil
+import hashlib
+import threading
+
+class ContentStore:
+    INDEX_NAME = "index.json"
+
+    def __init__(self, root, max_bytes) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.objects_path = os.path.join(root, "objects")
+        self.manifests_path = os.path.join(root, "manifests")
+        self.index_path = os.path.join(root, self.INDEX_NAME)
+        self.entries = {}
+        self.lock = threading.Lock()
+        os.makedirs(self.objects_path, exist_ok=True)
+        os.makedirs(self.manifests_path, exist_ok=True)
+        self.load()
+
+    @classmethod
+    def default_root(cls) -> str:
+        base_path = os.environ.get('LOCALAPPDATA') or os.environ.get('TEMP') or tempfile.gettempdir()
+        return os.path.join(base_path, 'LP_Store')
+
+    def load(self) -> None:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.entries = {sha256: list(values) for sha256, values in json.load(f).items()}
+        except (OSError, ValueError, AttributeError):
+            self.entries = {}
+
+    def save(self) -> None:
+        with self.lock:
+            data = dict(self.entries)
+        temp_path = self.index_path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_path, self.index_path)
+        except OSError:
+            pass
+
+    def object_path(self, sha256) -> str:
+        return os.path.join(self.objects_path, sha256[:2], sha256)
+
+    def contains(self, sha256) -> bool:
+        with self.lock:
+            return sha256 in self.entries
+
+    def get(self, sha256, dest_path) -> bool:
+        if not self.contains(sha256):
+            return False
+        h = hashlib.sha256()
+        try:
+            with open(self.object_path(sha256), 'rb') as src, open(dest_path, 'wb') as dst:
+                for chunk in iter(lambda: src.read(1048576), b''):
+                    h.update(chunk)
+                    dst.write(chunk)
+        except OSError:
+            self.forget(sha256)
+            return False
+        if h.hexdigest() != sha256:
+            self.forget(sha256)
+            return False
+        with self.lock:
+            if sha256 in self.entries:
+                self.entries[sha256][1] = time.time()
+        return True
+
+    def put_file(self, sha256, path) -> None:
+        if not sha256 or self.contains(sha256):
+            return
+        object_path = self.object_path(sha256)
+        temp_path = object_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            shutil.copyfile(path, temp_path)
+            os.replace(temp_path, object_path)
+            size = os.path.getsize(object_path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        with self.lock:
+            self.entries[sha256] = [size, time.time()]
+
+    def forget(self, sha256) -> None:
+        with self.lock:
+            self.entries.pop(sha256, None)
+        try:
+            os.remove(self.object_path(sha256))
+        except OSError:
+            pass
+
+    def put_manifest(self, version, data) -> None:
+        try:
+            with open(os.path.join(self.manifests_path, f"{version}.json"), 'wb') as f:
+                f.write(data)
+        except OSError:
+            pass
+
+    def get_manifest(self, version) -> bytes | None:
+        try:
+            with open(os.path.join(self.manifests_path, f"{version}.json"), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def evict(self) -> None:
+        with self.lock:
+            by_age = sorted(self.entries.items(), key=lambda item: item[1][1])
+            total_size = sum(size for size, _ in self.entries.values())
+        for sha256, (size, _) in by_age:
+            if total_size <= self.max_bytes:
+                break
+            self.forget(sha256)
+            total_size -= size
+        self.save()
\ No newline at end of file
@@ -0,0 +1,162 @@
+import os
+import time
+import mmap
+import zlib
+import struct
+import hashlib
+import zipfile
+
+import update_trace
+
+MIN_BUFFER_SIZE = 256 * 1024
+MAX_BUFFER_SIZE = 16 * 1024 * 1024
+LOCAL_HEADER_SIZE = 30
+LARGE_ENTRY_SIZE = 1024 * 1024
+
+class IoTimer:
+    __slots__ = ("hashing", "writing")
+
+    def __init__(self) -> None:
+        self.hashing = 0.0
+        self.writing = 0.0
+
+    def crc32(self, data, crc) -> int:
+        start = time.perf_counter()
+        crc = zlib.crc32(data, crc)
+        self.hashing += time.perf_counter() - start
+        return crc
+
+    def update(self, digest, data) -> None:
+        start = time.perf_counter()
+        digest.update(data)
+        self.hashing += time.perf_counter() - start
+
+    def write(self, output, data) -> None:
+        start = time.perf_counter()
+        output.write(data)
+        self.writing += time.perf_counter() - start
+
+    def flush(self) -> None:
+        update_trace.add_time("hashing", self.hashing)
+        update_trace.add_time("writing", self.writing)
+        self.hashing = self.writing = 0.0
+
+def buffer_size(size) -> int:
+    return max(MIN_BUFFER_SIZE, min(MAX_BUFFER_SIZE, size // 8))
+
+def preallocate(f, size) -> None:
+    if size <= 0:
+        return
+    try:
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(f.fileno(), 0, size)
+        else:
+            f.truncate(size)
+    except OSError:
+        pass # only a layout hint, the writes below still grow the file
+
+def write_all(output, data) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[output.write(view):]
+
+def copy_stream(source, output, size=0) -> None:
+    chunk_size = buffer_size(size)
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        write_all(output, chunk)
+
+def copy_range(source, offset, length, output) -> int:
+    crc = 0
+    if length <= 0:
+        return crc
+    start = offset - offset % mmap.ALLOCATIONGRANULARITY
+    chunk_size = buffer_size(length)
+    with mmap.mmap(source.fileno(), length + offset - start, access=mmap.ACCESS_READ, offset=start) as mapped, memoryview(mapped) as view:
+        position = offset - start
+        end = position + length
+        while position < end:
+            with view[position:min(position + chunk_size, end)] as chunk:
+                crc = zlib.crc32(chunk, crc)
+                write_all(output, chunk)
+                position += len(chunk)
+    return crc
+
+def entry_data_offset(archive, info) -> int:
+    archive.seek(info.header_offset)
+    header = archive.read(LOCAL_HEADER_SIZE)
+    if len(header) != LOCAL_HEADER_SIZE or header[:4] != b'PK\x03\x04':
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    return info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length
+
+def is_plain_stored(info) -> bool:
+    return info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1
+
+def extract_entry(zip_ref, info, target_file) -> None:
+    start = time.perf_counter()
+    try:
+        write_entry(zip_ref, info, target_file)
+    finally:
+        update_trace.add_time("writing", time.perf_counter() - start)
+
+def write_entry(zip_ref, info, target_file) -> None:
+    if info.file_size < LARGE_ENTRY_SIZE:
+        with zip_ref.open(info) as source, open(target_file, 'wb') as output:
+            output.write(source.read())
+        return
+    with open(target_file, 'wb', buffering=0) as output:
+        preallocate(output, info.file_size)
+        if is_plain_stored(info):
+            crc = copy_range(zip_ref.fp, entry_data_offset(zip_ref.fp, info), info.file_size, output)
+            if crc != info.CRC:
+                raise zipfile.BadZipFile(f"Bad CRC-32 for {info.filename}")
+        else:
+            with zip_ref.open(info) as source:
+                copy_stream(source, output, info.file_size)
+        output.truncate()
+
+def is_inside(root, name) -> bool:
+    root = os.path.abspath(root)
+    try:
+        return os.path.commonpath([root, os.path.abspath(os.path.join(root, name))]) == root
+    except ValueError:
+        return False
+
+def replace_file(source, target_file, name) -> None:
+    try:
+        os.replace(source, target_file)
+    except PermissionError:
+        try:
+            os.chmod(target_file, 0o777)
+            os.replace(source, target_file)
+        except:
+            raise Exception(f"Failed to replace locked file: {name}")
+
+def file_crc32(path) -> int:
+    start = time.perf_counter()
+    crc = 0
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < MIN_BUFFER_SIZE:
+                return zlib.crc32(f.read()) # a buffer sized for large files costs more than hashing a small one
+            buffer = bytearray(buffer_size(size))
+            view = memoryview(buffer)
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    return crc
+                crc = zlib.crc32(view[:count], crc)
+    finally:
+        update_trace.add_time("hashing", time.perf_counter() - start)
+
+def file_sha256(path) -> str:
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+    finally:
+        update_trace.add_time("hashing", time.perf_counter() - start)
\ No newline at end of file
@@ -0,0 +1,53 @@
+import threading
+import http.client
+import urllib.parse
+
+import update_trace
+
+class KeepAliveConnection:
+    def __init__(self, base_url, timeout=10) -> None:
+        parts = urllib.parse.urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def connect(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, timeout=self.timeout)
+
+    def open(self) -> None:
+        with self.lock:
+            if self.connection is None:
+                self.connection = self.connect()
+                self.connection.connect()
+
+    def get(self, path, headers=None) -> tuple[int, http.client.HTTPMessage, bytes]:
+        with self.lock:
+            for attempt in range(2): # a reused connection may have been dropped by the server
+                if self.connection is None:
+                    self.connection = self.connect()
+                try:
+                    self.connection.request("GET", self.prefix + path, headers=headers or {})
+                    response = self.connection.getresponse()
+                    body = response.read()
+                    if response.will_close:
+                        self.close_connection()
+                    return response.status, response.headers, body
+                except (http.client.HTTPException, OSError):
+                    self.close_connection()
+                    if attempt:
+                        raise
+                    update_trace.count("reconnects")
+
+    def close_connection(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def close(self) -> None:
+        with self.lock:
+            self.close_connection()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import os
+import json
+import hashlib
+
+class IndexEntry:
+    __slots__ = ("size", "mtime_ns", "crc32", "sha256")
+
+    def __init__(self, size, mtime_ns, crc32=None, sha256=None) -> None:
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.crc32 = crc32
+        self.sha256 = sha256
+
+class InstallIndex:
+    FILE_NAME = "LP_InstallIndex.json"
+    VERSION = 1
+
+    def __init__(self, target_path) -> None:
+        self.target_path = target_path
+        self.path = os.path.join(target_path, self.FILE_NAME)
+        self.entries = {}
+
+    @classmethod
+    def load(cls, target_path) -> "InstallIndex":
+        index = cls(target_path)
+        try:
+            with open(index.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == cls.VERSION:
+                for rel_path, values in data["files"].items():
+                    index.entries[rel_path] = IndexEntry(*values)
+        except (OSError, ValueError, KeyError, TypeError):
+            index.entries = {}
+        return index
+
+    def lookup(self, rel_path, st) -> IndexEntry | None:
+        entry = self.entries.get(rel_path)
+        if entry is None or entry.size != st.st_size or entry.mtime_ns != st.st_mtime_ns:
+            return None
+        return entry
+
+    def record(self, rel_path, st, crc32=None, sha256=None) -> None:
+        self.entries[rel_path] = IndexEntry(st.st_size, st.st_mtime_ns, crc32, sha256)
+
+    def paths(self) -> set:
+        return set(self.entries)
+
+    def fingerprint(self) -> str:
+        h = hashlib.sha256()
+        for rel_path in sorted(self.entries):
+            entry = self.entries[rel_path]
+            h.update(f"{rel_path}\0{entry.size}\0{entry.crc32}\0{entry.sha256}\n".encode('utf-8'))
+        return h.hexdigest()
+
+    def verify(self) -> bool:
+        for rel_path in self.entries:
+            try:
+                st = os.stat(os.path.join(self.target_path, rel_path))
+            except OSError:
+                return False
+            if self.lookup(rel_path, st) is None:
+                return False
+        return True
+
+    def save(self) -> None:
+        data = {
+            "version": self.VERSION,
+            "files": {
+                rel_path: [entry.size, entry.mtime_ns, entry.crc32, entry.sha256]
+                for rel_path, entry in self.entries.items()
+            },
+        }
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass
\ No newline at end of file
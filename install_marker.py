@@ -0,0 +1,43 @@
+import os
+import json
+
+class InstallMarker:
+    FILE_NAME = "LP_Installed.json"
+
+    def __init__(self, target_path, version=None, fingerprint=None, etag=None, last_modified=None) -> None:
+        self.path = os.path.join(target_path, self.FILE_NAME)
+        self.version = version
+        self.fingerprint = fingerprint
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @classmethod
+    def load(cls, target_path) -> "InstallMarker | None":
+        try:
+            with open(os.path.join(target_path, cls.FILE_NAME), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return cls(target_path, data["version"], data["fingerprint"], data.get("etag"), data.get("last_modified"))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @classmethod
+    def remove(cls, target_path) -> None:
+        try:
+            os.remove(os.path.join(target_path, cls.FILE_NAME))
+        except OSError:
+            pass
+
+    def save(self) -> None:
+        data = {
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+        }
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass
\ No newline at end of file
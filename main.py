@@ -1,9 +1,6 @@
 import sys
-import os
-import subprocess
 from typing import Never
-from PySide6.QtWidgets import QApplication, QMessageBox
-from updater_dialog import UpdaterDialog
+from updater_cli import check_args, update_options, kill_launcher, run_headless
 
 STYLE_SHEET = """
 * {
@@ -71,6 +68,7 @@ QMessageBox QPushButton:hover {
 """
 
 def show_error(parent, title, message) -> None:
+    from PySide6.QtWidgets import QMessageBox
     msg_box = QMessageBox(parent)
     msg_box.setWindowTitle(title)
     msg_box.setText(message)
@@ -79,24 +77,26 @@ def show_error(parent, title, message) -> None:
     msg_box.exec()
 
 def main() -> Never:
+    if "--headless" in sys.argv[1:]:
+        sys.exit(run_headless(sys.argv[1:])) # never loads PySide6
+
+    from PySide6.QtWidgets import QApplication
+    from updater_dialog import UpdaterDialog
+
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     app.setStyleSheet(STYLE_SHEET)
     
-    if len(sys.argv) < 2:
-        show_error(None, "Error", "Missing target path argument.")
-        sys.exit(1)
-    target_path = sys.argv[1]
-    if not os.path.isdir(target_path):
-        show_error(None, "Error", f"Invalid directory: {target_path}")
+    try:
+        args = check_args(sys.argv[1:])
+    except Exception as e:
+        show_error(None, "Error", str(e))
         sys.exit(1)
     
-    subprocess.Popen(
-        ["taskkill", "/F", "/IM", "LegacyPlay_Launcher.exe"],
-        creationflags=subprocess.CREATE_NO_WINDOW
-    )
+    if not args.staged:
+        kill_launcher()
 
-    dialog = UpdaterDialog(target_path)
+    dialog = UpdaterDialog(args.target_path, **update_options(args))
     dialog.show()
     sys.exit(app.exec())
 
@@ -0,0 +1,330 @@
+import time
+import queue
+import threading
+import http.client
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from http_connection import KeepAliveConnection
+import update_trace
+
+class MirrorSlow(Exception):
+    pass
+
+class Mirror:
+    def __init__(self, base_url, timeout=10) -> None:
+        self.base_url = base_url.rstrip('/')
+        self.connection = KeepAliveConnection(self.base_url, timeout)
+        self.latency = None
+        self.rate = 0.0
+        self.active = 0
+        self.failures = 0
+        self.retry_at = 0.0
+        self.racing = False
+
+    def url(self, path) -> str:
+        return self.base_url + path
+
+class HeadResult:
+    __slots__ = ("mirror", "size", "accepts_ranges", "etag", "last_modified")
+
+    def __init__(self, mirror, size, accepts_ranges, etag, last_modified) -> None:
+        self.mirror = mirror
+        self.size = size
+        self.accepts_ranges = accepts_ranges
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def if_range(self) -> str | None:
+        if self.etag and not self.etag.startswith('W/'):
+            return self.etag
+        return self.last_modified
+
+class MirrorPool:
+    TIMEOUT = 15
+    STALL_TIMEOUT = 5
+    PROBE_GRACE = 1.0
+    UNKNOWN_LATENCY = 1.0
+    COOLDOWN = 5.0
+    MAX_COOLDOWN = 60.0
+    SMOOTHING = 0.3
+    SAMPLE_SIZE = 1024 * 1024
+    SAMPLE_INTERVAL = 2.0
+    SWITCH_FACTOR = 2.0
+
+    def __init__(self, base_urls, timeout=10) -> None:
+        self.mirrors = []
+        for base_url in base_urls:
+            if base_url and base_url.rstrip('/') not in [mirror.base_url for mirror in self.mirrors]:
+                self.mirrors.append(Mirror(base_url, timeout))
+        if not self.mirrors:
+            raise Exception("No update mirrors configured.")
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.mirrors)
+
+    @property
+    def transfer_timeout(self) -> int:
+        return self.STALL_TIMEOUT if len(self.mirrors) > 1 else self.TIMEOUT # with somewhere else to go, give up on a stalled mirror sooner
+
+    def race(self, path, headers=None) -> tuple[Mirror, int, http.client.HTTPMessage, bytes]:
+        if len(self.mirrors) == 1:
+            return self.mirrors[0], *self.fetch(self.mirrors[0], path, headers)
+        results = queue.Queue()
+        for mirror in self.mirrors:
+            mirror.racing = True
+            threading.Thread(target=self.race_mirror, args=(mirror, path, headers, results), daemon=True).start()
+        fallback = None
+        error = None
+        for _ in self.mirrors:
+            mirror, result = results.get()
+            if isinstance(result, Exception):
+                error = error or result
+            elif result[0] < 400:
+                return mirror, *result
+            elif fallback is None:
+                fallback = (mirror, *result)
+        if fallback is not None:
+            return fallback
+        raise error
+
+    def race_mirror(self, mirror, path, headers, results) -> None:
+        try:
+            result = self.fetch(mirror, path, headers)
+        except Exception as e:
+            result = e
+        with self.lock:
+            mirror.racing = False
+            closed = self.closed
+        if closed:
+            mirror.connection.close()
+        results.put((mirror, result))
+
+    def fetch(self, mirror, path, headers=None) -> tuple[int, http.client.HTTPMessage, bytes]:
+        start = time.perf_counter()
+        try:
+            with update_trace.span("connect", "mirror", url=mirror.base_url):
+                mirror.connection.open()
+            with update_trace.span("request", "mirror", url=mirror.base_url, path=path):
+                result = mirror.connection.get(path, headers)
+        except Exception:
+            self.fail(mirror)
+            raise
+        self.record_latency(mirror, time.perf_counter() - start)
+        return result
+
+    def head(self, path) -> list[HeadResult]:
+        mirrors = self.ranked()
+        if len(mirrors) == 1:
+            return [self.head_mirror(mirrors[0], path)]
+        pool = ThreadPoolExecutor(max_workers=len(mirrors))
+        pending = {pool.submit(self.head_mirror, mirror, path) for mirror in mirrors}
+        results = []
+        error = None
+        deadline = None
+        try:
+            while pending:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break # the rest are too slow to be worth waiting for
+                for future in done:
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        error = error or e
+                if results and deadline is None:
+                    deadline = time.monotonic() + self.PROBE_GRACE
+        finally:
+            pool.shutdown(wait=False)
+        if not results:
+            raise error
+        return results
+
+    def head_mirror(self, mirror, path) -> HeadResult:
+        request = urllib.request.Request(mirror.url(path), method="HEAD")
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.TIMEOUT) as response:
+                headers = response.headers
+        except urllib.error.HTTPError:
+            raise
+        except (urllib.error.URLError, OSError):
+            self.fail(mirror)
+            raise
+        self.record_latency(mirror, time.perf_counter() - start)
+        return HeadResult(
+            mirror,
+            int(headers.get('Content-Length') or 0),
+            headers.get('Accept-Ranges', '').lower() == 'bytes',
+            headers.get('ETag'),
+            headers.get('Last-Modified'),
+        )
+
+    def agreeing(self, results) -> list[HeadResult]:
+        ranged = [result for result in results if result.accepts_ranges and result.size]
+        sizes = [result.size for result in ranged]
+        if not sizes:
+            return []
+        size = max(sizes, key=sizes.count) # ties go to the quickest mirror
+        return [result for result in ranged if result.size == size]
+
+    def best_rate(self) -> float:
+        return max(mirror.rate for mirror in self.mirrors)
+
+    def cost(self, mirror, joining) -> float:
+        latency = mirror.latency if mirror.latency is not None else self.UNKNOWN_LATENCY
+        rate = mirror.rate or self.best_rate() # untried mirrors get the benefit of the doubt
+        if not rate:
+            return latency * (mirror.active + joining)
+        return latency + self.SAMPLE_SIZE * (mirror.active + joining) / rate
+
+    def ranked(self) -> list[Mirror]:
+        with self.lock:
+            now = time.monotonic()
+            return sorted(self.mirrors, key=lambda mirror: (mirror.retry_at > now, self.cost(mirror, 1)))
+
+    def acquire(self, candidates) -> Mirror:
+        with self.lock:
+            now = time.monotonic()
+            ready = [mirror for mirror in candidates if mirror.retry_at <= now]
+            if ready:
+                mirror = min(ready, key=lambda mirror: self.cost(mirror, 1))
+            else:
+                mirror = min(candidates, key=lambda mirror: mirror.retry_at)
+            mirror.active += 1
+            return mirror
+
+    def release(self, mirror) -> None:
+        with self.lock:
+            mirror.active -= 1
+
+    def ready(self, candidates) -> bool:
+        now = time.monotonic()
+        return any(mirror.retry_at <= now for mirror in candidates)
+
+    def record(self, mirror, size, seconds) -> None:
+        if seconds <= 0:
+            return
+        with self.lock:
+            current = size / seconds
+            mirror.rate = current if not mirror.rate else self.SMOOTHING * current + (1 - self.SMOOTHING) * mirror.rate
+            mirror.failures = 0
+            mirror.retry_at = 0.0
+
+    def record_latency(self, mirror, seconds) -> None:
+        with self.lock:
+            mirror.latency = seconds if mirror.latency is None else self.SMOOTHING * seconds + (1 - self.SMOOTHING) * mirror.latency
+
+    def fail(self, mirror) -> None:
+        with self.lock:
+            mirror.failures += 1
+            mirror.retry_at = time.monotonic() + min(self.COOLDOWN * mirror.failures, self.MAX_COOLDOWN)
+
+    def failover(self, sources, retry_delay, max_retries) -> "Failover":
+        return Failover(self, sources, retry_delay, max_retries)
+
+    def sample(self, mirror) -> "Sample":
+        return Sample(self, mirror)
+
+    def should_switch(self, mirror, candidates) -> bool:
+        with self.lock:
+            if not mirror.rate:
+                return False
+            now = time.monotonic()
+            others = [other for other in candidates if other is not mirror and other.retry_at <= now]
+            if not others:
+                return False
+            return min(self.cost(other, 1) for other in others) * self.SWITCH_FACTOR < self.cost(mirror, 0)
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            idle = [mirror for mirror in self.mirrors if not mirror.racing]
+        for mirror in idle: # a mirror still answering the version race closes its own connection when done
+            mirror.connection.close()
+
+class Sample:
+    def __init__(self, pool, mirror) -> None:
+        self.pool = pool
+        self.mirror = mirror
+        self.start = time.monotonic()
+        self.size = 0
+
+    def add(self, size) -> bool:
+        self.size += size
+        now = time.monotonic()
+        if self.size < self.pool.SAMPLE_SIZE and now - self.start < self.pool.SAMPLE_INTERVAL:
+            return False
+        self.pool.record(self.mirror, self.size, now - self.start)
+        self.start = now
+        self.size = 0
+        return True
+
+class Failover:
+    def __init__(self, pool, sources, retry_delay, max_retries) -> None:
+        self.pool = pool
+        self.sources = dict(sources) # mirror -> HeadResult, replaced wholesale so readers never see it change
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+
+    @property
+    def max_failures(self) -> int:
+        return self.max_retries * max(1, len(self.sources))
+
+    def run(self, attempt, is_done, should_stop, describe, drop_errors=()) -> None:
+        failures = 0
+        while is_done is None or not is_done(): # without is_done, a single successful attempt is enough
+            if should_stop():
+                return
+            mirror = self.pool.acquire(self.sources)
+            try:
+                attempt(mirror)
+                if is_done is None:
+                    return
+                failures = 0
+            except MirrorSlow:
+                update_trace.count("mirror_switches")
+            except drop_errors:
+                if not self.drop(mirror): # the mirror may be serving a different build
+                    raise
+            except urllib.error.HTTPError as e:
+                if e.code < 500:
+                    if not self.drop(mirror):
+                        raise
+                elif failures >= self.max_failures:
+                    raise
+                else:
+                    failures = self.retry(mirror, failures)
+            except (urllib.error.URLError, http.client.HTTPException, OSError): # a dropped connection can surface as IncompleteRead
+                if should_stop():
+                    return
+                if failures >= self.max_failures:
+                    raise ConnectionError(f"{describe()} failed after {failures + 1} attempts.")
+                failures = self.retry(mirror, failures)
+            finally:
+                self.pool.release(mirror)
+
+    def retry(self, mirror, failures) -> int:
+        failures += 1
+        update_trace.count("retries")
+        self.pool.fail(mirror)
+        if self.pool.ready(self.sources):
+            update_trace.count("failovers") # carry on from another mirror right away
+        else:
+            time.sleep(self.retry_delay * failures)
+        return failures
+
+    def drop(self, mirror) -> bool:
+        with self.lock:
+            if mirror in self.sources:
+                if len(self.sources) == 1:
+                    return False
+                self.sources = {other: result for other, result in self.sources.items() if other is not mirror}
+        update_trace.count("failovers")
+        return True
\ No newline at end of file
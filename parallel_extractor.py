@@ -0,0 +1,140 @@
+import os
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from file_io import extract_entry, is_inside
+import update_trace
+
+def check_paths(target_path, files) -> None:
+    for info in files:
+        if not is_inside(target_path, info.filename):
+            raise zipfile.BadZipFile(f"Unsafe path in archive: {info.filename}")
+
+def prepare_directories(target_path, files) -> None:
+    check_paths(target_path, files) # before any directory is created
+    directories = set()
+    for info in files:
+        path = info.filename.rstrip('/')
+        if info.is_dir():
+            directories.add(path)
+        elif '/' in path:
+            directories.add(path.rsplit('/', 1)[0])
+    for directory in sorted(directories):
+        os.makedirs(os.path.join(target_path, directory), exist_ok=True)
+
+class ParallelExtractor:
+    LARGE_FILE_SIZE = 8 * 1024 * 1024
+    SMALL_BATCH_BYTES = 4 * 1024 * 1024
+    SMALL_BATCH_FILES = 256
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, zip_path, target_path, workers=None, is_current=None, on_installed=None,
+                 stop_check=None, progress_callback=None, output_path=None) -> None:
+        self.zip_path = zip_path
+        self.target_path = target_path
+        self.output_path = output_path or target_path
+        self.workers = max(1, workers or os.cpu_count() or 4)
+        self.is_current = is_current or (lambda target_file, info: False)
+        self.on_installed = on_installed or (lambda info, target_file: None)
+        self.stop_check = stop_check or (lambda: False)
+        self.progress_callback = progress_callback
+        self.completed = 0
+        self.aborted = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.handles = []
+
+    def should_stop(self) -> bool:
+        return self.aborted or self.stop_check()
+
+    def run(self, files) -> None:
+        entries = [info for info in files if not info.is_dir()]
+        prepare_directories(self.output_path, files)
+        self.completed = len(files) - len(entries)
+        total_files = len(files)
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            pending = {pool.submit(self.extract_batch, batch) for batch in self.schedule(entries)}
+            reported = -1
+            while pending:
+                done, pending = wait(pending, timeout=self.PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                if self.completed != reported and self.progress_callback:
+                    reported = self.completed
+                    self.progress_callback(reported, total_files)
+        except BaseException:
+            self.aborted = True
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            for handle in self.handles:
+                handle.close()
+            self.handles = []
+
+    def schedule(self, entries) -> list[list]:
+        large = sorted((info for info in entries if info.file_size >= self.LARGE_FILE_SIZE),
+                       key=lambda info: info.file_size, reverse=True)
+        batches = [[info] for info in large]
+        batch = []
+        batch_bytes = 0
+        for info in entries:
+            if info.file_size >= self.LARGE_FILE_SIZE:
+                continue
+            batch.append(info)
+            batch_bytes += info.file_size
+            if batch_bytes >= self.SMALL_BATCH_BYTES or len(batch) >= self.SMALL_BATCH_FILES:
+                batches.append(batch)
+                batch = []
+                batch_bytes = 0
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def zip_handle(self) -> zipfile.ZipFile:
+        handle = getattr(self.local, 'zip_ref', None)
+        if handle is None:
+            handle = zipfile.ZipFile(self.zip_path)
+            self.local.zip_ref = handle
+            with self.lock:
+                self.handles.append(handle)
+        return handle
+
+    def extract_batch(self, batch) -> None:
+        zip_ref = self.zip_handle()
+        for info in batch:
+            if self.should_stop():
+                return
+            if not is_inside(self.output_path, info.filename):
+                raise zipfile.BadZipFile(f"Unsafe path in archive: {info.filename}")
+            target_file = os.path.join(self.target_path, info.filename)
+            if not self.is_current(target_file, info):
+                target_file = os.path.join(self.output_path, info.filename)
+                with update_trace.span("extract_file", "file", path=info.filename):
+                    self.extract_member(zip_ref, info, target_file)
+                update_trace.count("files_written")
+                update_trace.count("bytes_written", info.file_size)
+            self.on_installed(info, target_file)
+            with self.lock:
+                self.completed += 1
+
+    def extract_member(self, zip_ref, info, target_file) -> None:
+        if os.path.exists(target_file):
+            try:
+                os.remove(target_file)
+            except PermissionError:
+                try:
+                    os.chmod(target_file, 0o777)
+                    os.remove(target_file)
+                except:
+                    pass
+        try:
+            extract_entry(zip_ref, info, target_file)
+        except PermissionError:
+            try:
+                os.chmod(target_file, 0o777)
+                os.remove(target_file)
+                extract_entry(zip_ref, info, target_file)
+            except:
+                raise Exception(f"Failed to replace locked file: {info.filename}")
\ No newline at end of file
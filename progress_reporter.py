@@ -0,0 +1,84 @@
+import time
+import threading
+
+class ProgressInfo:
+    __slots__ = ("phase", "done", "total", "rate", "eta")
+
+    def __init__(self, phase, done, total, rate, eta) -> None:
+        self.phase = phase
+        self.done = done
+        self.total = total
+        self.rate = rate
+        self.eta = eta
+
+    @property
+    def percent(self) -> int:
+        if not self.total:
+            return 0
+        return min(int(self.done * 100 / self.total), 100)
+
+class ProgressReporter:
+    INTERVAL = 0.1
+    SMOOTHING = 0.3
+
+    def __init__(self, on_progress, on_phase=None, interval=INTERVAL) -> None:
+        self.on_progress = on_progress
+        self.on_phase = on_phase
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.phase = None
+        self.done = 0
+        self.total = 0
+        self.rate = 0.0
+        self.last_emit = 0.0
+        self.last_done = 0
+
+    def start_phase(self, phase, total=0) -> None:
+        with self.lock:
+            changed = phase != self.phase
+            self.phase = phase
+            self.done = 0
+            self.total = total
+            self.rate = 0.0
+            self.last_done = 0
+            self.last_emit = time.monotonic()
+        if changed and self.on_phase:
+            self.on_phase(phase)
+        self.flush()
+
+    def add_total(self, amount) -> None:
+        with self.lock:
+            self.total += amount
+
+    def update(self, done, total=None) -> None:
+        with self.lock:
+            self.done = done
+            if total is not None:
+                self.total = total
+            info = self.sample(time.monotonic())
+        if info is not None:
+            self.on_progress(info)
+
+    def advance(self, amount) -> None:
+        with self.lock:
+            self.done += amount
+            info = self.sample(time.monotonic())
+        if info is not None:
+            self.on_progress(info)
+
+    def flush(self) -> None:
+        with self.lock:
+            info = self.sample(time.monotonic(), force=True)
+        self.on_progress(info)
+
+    def sample(self, now, force=False) -> ProgressInfo | None:
+        elapsed = now - self.last_emit
+        if not force and elapsed < self.interval:
+            return None
+        if elapsed >= self.interval and self.done >= self.last_done:
+            current = (self.done - self.last_done) / elapsed
+            self.rate = current if not self.rate else self.SMOOTHING * current + (1 - self.SMOOTHING) * self.rate
+        self.last_emit = now
+        self.last_done = self.done
+        eta = (self.total - self.done) / self.rate if self.rate and self.total > self.done else None
+        return ProgressInfo(self.phase, self.done, self.total, self.rate, eta)
\ No newline at end of file
@@ -0,0 +1,302 @@
+import os
+import json
+import time
+import zlib
+import threading
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from file_io import preallocate
+from mirror_pool import MirrorPool, MirrorSlow
+import update_trace
+
+class ArchiveChanged(Exception):
+    def __init__(self, message="The update archive changed on the server during the download.") -> None:
+        super().__init__(message)
+
+class RangesIgnored(Exception):
+    def __init__(self, message="The server ignored the requested byte range.") -> None:
+        super().__init__(message)
+
+class Segment:
+    def __init__(self, index, start, end) -> None:
+        self.index = index
+        self.start = start
+        self.end = end
+        self.position = start
+
+    @property
+    def remaining(self) -> int:
+        return self.end + 1 - self.position
+
+class SegmentedDownloader:
+    BLOCK_SIZE = 65536
+    CHECKSUM_BLOCK_SIZE = 1024 * 1024
+    MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+    MAX_RETRIES = 4
+    RETRY_DELAY = 1.0
+    STATE_SUFFIX = ".part.json"
+    STATE_SAVE_INTERVAL = 1.0
+
+    def __init__(self, url, path, connections=4, progress_callback=None, stop_check=None, mirrors=None) -> None:
+        self.url = url
+        self.mirrors = mirrors or MirrorPool([url])
+        self.resource = url if mirrors else ''
+        self.path = path
+        self.state_path = path + self.STATE_SUFFIX
+        self.connections = max(1, connections)
+        self.progress_callback = progress_callback
+        self.stop_check = stop_check or (lambda: False)
+        self.total_size = 0
+        self.downloaded = 0
+        self.source = None
+        self.failover = self.mirrors.failover({}, self.RETRY_DELAY, self.MAX_RETRIES)
+        self.blocks = {}
+        self.aborted = False
+        self.last_save = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def block_count(self) -> int:
+        return -(-self.total_size // self.CHECKSUM_BLOCK_SIZE)
+
+    def block_length(self, index) -> int:
+        return min(self.CHECKSUM_BLOCK_SIZE, self.total_size - index * self.CHECKSUM_BLOCK_SIZE)
+
+    def should_stop(self) -> bool:
+        return self.aborted or self.stop_check()
+
+    def download(self) -> None:
+        self.total_size, accepts_ranges = self.probe()
+        try:
+            if accepts_ranges:
+                try:
+                    self.download_ranges()
+                except ArchiveChanged:
+                    self.discard_partial()
+                    self.total_size, accepts_ranges = self.probe() # pick up the new validators before starting over
+                    if accepts_ranges:
+                        self.download_ranges()
+        except RangesIgnored:
+            accepts_ranges = False # advertised, but the server sends the whole file anyway
+        if not accepts_ranges:
+            self.discard_partial()
+            self.download_single()
+
+    def probe(self) -> tuple[int, bool]:
+        try:
+            results = self.mirrors.head(self.resource)
+        except urllib.error.HTTPError as e:
+            if e.code not in (403, 405, 501):
+                raise
+            self.source = self.mirrors.ranked()[0]
+            self.failover = self.mirrors.failover({}, self.RETRY_DELAY, self.MAX_RETRIES)
+            return 0, False
+        agreeing = self.mirrors.agreeing(results)
+        reference = agreeing[0] if agreeing else results[0]
+        self.source = reference.mirror
+        self.failover = self.mirrors.failover({result.mirror: result for result in agreeing}, self.RETRY_DELAY, self.MAX_RETRIES)
+        return reference.size, bool(agreeing)
+
+    def download_ranges(self) -> None:
+        self.aborted = False
+        self.load_state()
+        self.downloaded = sum(self.block_length(index) for index in self.blocks)
+        if self.downloaded:
+            self.report(0)
+        segments = self.plan_segments()
+        if not segments:
+            self.discard_state()
+            return
+        pool = ThreadPoolExecutor(max_workers=len(segments))
+        try:
+            futures = [pool.submit(self.fetch_segment, segment) for segment in segments]
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            self.aborted = True
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            if len(self.blocks) == self.block_count:
+                self.discard_state()
+            else:
+                self.save_state(force=True)
+
+    def load_state(self) -> None:
+        state = None
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if state and self.matches(state) and os.path.isfile(self.path) and os.path.getsize(self.path) == self.total_size:
+            self.blocks = self.verify_blocks({int(index): crc for index, crc in state.get('blocks', {}).items()})
+        else:
+            self.discard_partial()
+            self.blocks = {}
+            with open(self.path, 'wb') as f:
+                preallocate(f, self.total_size)
+        self.save_state(force=True)
+
+    def matches(self, state) -> bool:
+        validators = state.get('validators') or {}
+        return (
+            state.get('url') == self.url
+            and state.get('total_size') == self.total_size
+            and state.get('block_size') == self.CHECKSUM_BLOCK_SIZE
+            and any(result.if_range and validators.get(mirror.base_url) == result.if_range
+                    for mirror, result in self.failover.sources.items())
+        )
+
+    def verify_blocks(self, blocks) -> dict:
+        verified = {}
+        with open(self.path, 'rb') as f:
+            for index in sorted(blocks):
+                if index >= self.block_count:
+                    continue
+                f.seek(index * self.CHECKSUM_BLOCK_SIZE)
+                data = f.read(self.block_length(index))
+                if zlib.crc32(data) == blocks[index]:
+                    verified[index] = blocks[index]
+        return verified
+
+    def save_state(self, force=False) -> None:
+        now = time.monotonic()
+        if not force and now - self.last_save < self.STATE_SAVE_INTERVAL:
+            return
+        self.last_save = now
+        state = {
+            'url': self.url,
+            'validators': {mirror.base_url: result.if_range for mirror, result in self.failover.sources.items() if result.if_range},
+            'total_size': self.total_size,
+            'block_size': self.CHECKSUM_BLOCK_SIZE,
+            'bytes_done': sum(self.block_length(index) for index in self.blocks),
+            'blocks': {str(index): crc for index, crc in self.blocks.items()},
+        }
+        temp_path = self.state_path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_path)
+        except OSError:
+            pass
+
+    def discard_state(self) -> None:
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+
+    def discard_partial(self) -> None:
+        self.discard_state()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def plan_segments(self) -> list[Segment]:
+        runs = []
+        for index in range(self.block_count):
+            if index in self.blocks:
+                continue
+            if runs and runs[-1][1] == index - 1:
+                runs[-1][1] = index
+            else:
+                runs.append([index, index])
+        missing = sum(last - first + 1 for first, last in runs) * self.CHECKSUM_BLOCK_SIZE
+        count = min(self.connections, max(1, missing // self.MIN_SEGMENT_SIZE))
+        while len(runs) < count:
+            largest = max(runs, key=lambda run: run[1] - run[0])
+            if largest[0] == largest[1]:
+                break
+            middle = (largest[0] + largest[1] + 1) // 2
+            runs.insert(runs.index(largest) + 1, [middle, largest[1]])
+            largest[1] = middle - 1
+        segments = []
+        for index, (first, last) in enumerate(runs):
+            start = first * self.CHECKSUM_BLOCK_SIZE
+            end = min((last + 1) * self.CHECKSUM_BLOCK_SIZE, self.total_size) - 1
+            segments.append(Segment(index, start, end))
+        return segments
+
+    def fetch_segment(self, segment) -> None:
+        self.failover.run(lambda mirror: self.read_range(segment, mirror), lambda: segment.remaining <= 0,
+                          self.should_stop, lambda: f"Segment {segment.index + 1}", (ArchiveChanged, RangesIgnored))
+
+    def read_range(self, segment, mirror) -> None:
+        source = self.failover.sources.get(mirror)
+        if source is None:
+            return # dropped by another segment meanwhile
+        block_start = segment.position - segment.position % self.CHECKSUM_BLOCK_SIZE
+        if block_start < segment.position:
+            with self.lock:
+                self.downloaded -= segment.position - block_start
+            segment.position = block_start
+        headers = {"Range": f"bytes={segment.position}-{segment.end}"}
+        if source.if_range:
+            headers["If-Range"] = source.if_range
+        request = urllib.request.Request(mirror.url(self.resource), headers=headers)
+        with urllib.request.urlopen(request, timeout=self.mirrors.transfer_timeout) as response:
+            if response.status != 206:
+                if source.if_range and source.if_range not in (response.headers.get('ETag'), response.headers.get('Last-Modified')):
+                    raise ArchiveChanged()
+                raise RangesIgnored()
+            with open(self.path, 'r+b') as f:
+                f.seek(segment.position)
+                crc = 0
+                sample_start = time.monotonic()
+                sample_size = 0
+                while segment.remaining > 0:
+                    if self.should_stop():
+                        return
+                    block_end = min((segment.position // self.CHECKSUM_BLOCK_SIZE + 1) * self.CHECKSUM_BLOCK_SIZE, segment.end + 1)
+                    chunk = response.read(min(self.BLOCK_SIZE, block_end - segment.position))
+                    if not chunk:
+                        raise ConnectionError("Connection closed before segment was complete.")
+                    f.write(chunk)
+                    crc = zlib.crc32(chunk, crc)
+                    segment.position += len(chunk)
+                    sample_size += len(chunk)
+                    self.report(len(chunk))
+                    if segment.position == block_end:
+                        self.complete_block((block_end - 1) // self.CHECKSUM_BLOCK_SIZE, crc)
+                        crc = 0
+                    now = time.monotonic()
+                    if segment.position == block_end or now - sample_start >= self.mirrors.SAMPLE_INTERVAL:
+                        self.mirrors.record(mirror, sample_size, now - sample_start)
+                        sample_start = now
+                        sample_size = 0
+                        if segment.remaining > 0 and self.mirrors.should_switch(mirror, self.failover.sources):
+                            raise MirrorSlow()
+
+    def complete_block(self, index, crc) -> None:
+        with self.lock:
+            self.blocks[index] = crc
+            self.save_state()
+
+    def download_single(self) -> None:
+        self.downloaded = 0
+        with urllib.request.urlopen(self.source.url(self.resource), timeout=15) as response:
+            total_size = response.headers.get('Content-Length')
+            self.total_size = int(total_size) if total_size else 0
+            with open(self.path, 'wb') as f:
+                while True:
+                    if self.stop_check():
+                        return
+                    chunk = response.read(self.BLOCK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    self.report(len(chunk))
+        if self.total_size and self.downloaded < self.total_size:
+            raise Exception("Download incomplete.")
+
+    def report(self, size) -> None:
+        with self.lock:
+            self.downloaded += size
+            downloaded = self.downloaded
+        update_trace.count("download_bytes", size)
+        if self.progress_callback:
+            self.progress_callback(downloaded, self.total_size)
\ No newline at end of file
@@ -0,0 +1,137 @@
+import os
+import json
+import shutil
+
+class StagedInstall:
+    JOURNAL_NAME = "LP_Update.journal"
+
+    def __init__(self, target_path) -> None:
+        self.target_path = target_path
+        base_path = os.path.abspath(target_path).rstrip('\\/')
+        self.staging_path = base_path + ".staging"
+        self.backup_path = base_path + ".backup"
+        self.journal_path = os.path.join(target_path, self.JOURNAL_NAME)
+
+    @classmethod
+    def recover(cls, target_path) -> None:
+        staged = cls(target_path)
+        journal = staged.read_journal()
+        if journal is None:
+            return
+        if journal.get("state") == "committing":
+            for rel_path in journal["directories"]:
+                os.makedirs(os.path.join(target_path, rel_path), exist_ok=True)
+            for rel_path in journal["files"]:
+                if os.path.exists(os.path.join(staged.staging_path, rel_path)):
+                    staged.swap(rel_path)
+        staged.finish()
+
+    def prepare(self) -> None:
+        self.remove_tree(self.staging_path)
+        self.remove_tree(self.backup_path)
+        os.makedirs(self.staging_path)
+
+    def read_journal(self) -> dict | None:
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_journal(self, journal) -> None:
+        temp_path = self.journal_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(journal, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.journal_path)
+
+    def scan(self) -> tuple[list, list]:
+        files = []
+        directories = []
+        for root, dirs, names in os.walk(self.staging_path):
+            rel_root = os.path.relpath(root, self.staging_path).replace('\\', '/')
+            prefix = '' if rel_root == '.' else rel_root + '/'
+            directories.extend(prefix + name for name in dirs)
+            files.extend(prefix + name for name in names)
+        return files, directories
+
+    def commit(self, before_commit=None) -> None:
+        files, directories = self.scan()
+        for rel_path in files:
+            self.link_backup(rel_path)
+        if before_commit:
+            before_commit()
+        self.write_journal({
+            "state": "committing",
+            "staging": self.staging_path,
+            "backup": self.backup_path,
+            "directories": directories,
+            "files": files,
+        })
+        try:
+            for rel_path in directories:
+                os.makedirs(os.path.join(self.target_path, rel_path), exist_ok=True)
+            for rel_path in files:
+                self.swap(rel_path)
+        except Exception as e:
+            self.rollback(files)
+            raise Exception(f"Failed to apply update: {e}")
+        self.finish()
+
+    def link_backup(self, rel_path) -> None:
+        live_file = os.path.join(self.target_path, rel_path)
+        if not os.path.isfile(live_file):
+            return
+        backup_file = os.path.join(self.backup_path, rel_path)
+        os.makedirs(os.path.dirname(backup_file), exist_ok=True)
+        try:
+            os.link(live_file, backup_file)
+        except OSError:
+            pass # no hardlink support here, swap() moves the live file aside instead
+
+    def swap(self, rel_path) -> None:
+        live_file = os.path.join(self.target_path, rel_path)
+        staged_file = os.path.join(self.staging_path, rel_path)
+        backup_file = os.path.join(self.backup_path, rel_path)
+        if os.path.isfile(live_file) and not os.path.exists(backup_file):
+            os.makedirs(os.path.dirname(backup_file), exist_ok=True)
+            os.replace(live_file, backup_file)
+        os.makedirs(os.path.dirname(live_file), exist_ok=True)
+        try:
+            os.replace(staged_file, live_file)
+        except PermissionError:
+            os.chmod(live_file, 0o777)
+            os.replace(staged_file, live_file)
+
+    def rollback(self, files) -> None:
+        for rel_path in files:
+            live_file = os.path.join(self.target_path, rel_path)
+            backup_file = os.path.join(self.backup_path, rel_path)
+            committed = not os.path.exists(os.path.join(self.staging_path, rel_path))
+            try:
+                if os.path.exists(backup_file) and (committed or not os.path.exists(live_file)):
+                    os.replace(backup_file, live_file)
+                elif committed and os.path.exists(live_file):
+                    os.remove(live_file)
+            except OSError:
+                pass
+        self.finish()
+
+    def discard(self) -> None:
+        if os.path.exists(self.journal_path):
+            return
+        self.remove_tree(self.staging_path)
+        self.remove_tree(self.backup_path)
+
+    def finish(self) -> None:
+        self.remove_tree(self.staging_path)
+        self.remove_tree(self.backup_path)
+        try:
+            os.remove(self.journal_path)
+        except OSError:
+            pass
+
+    def remove_tree(self, path) -> None:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
\ No newline at end of file
@@ -0,0 +1,360 @@
+import os
+import io
+import zlib
+import queue
+import struct
+import zipfile
+import threading
+import http.client
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from parallel_extractor import prepare_directories, check_paths
+from file_io import preallocate, replace_file, IoTimer
+from mirror_pool import MirrorPool, MirrorSlow
+import update_trace
+
+class RangesNotSupported(Exception):
+    pass
+
+class HttpRangeFile(io.RawIOBase):
+    TAIL_SIZE = 256 * 1024
+
+    def __init__(self, url, size) -> None:
+        super().__init__()
+        self.url = url
+        self.size = size
+        self.position = 0
+        self.cache_start = max(0, size - self.TAIL_SIZE)
+        self.cache = self.fetch(self.cache_start, size - 1)
+
+    def fetch(self, start, end) -> bytes:
+        request = urllib.request.Request(self.url, headers={"Range": f"bytes={start}-{end}"})
+        with urllib.request.urlopen(request, timeout=15) as response:
+            if response.status != 206:
+                raise RangesNotSupported()
+            return response.read()
+
+    def seekable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = self.size + offset
+        self.position = max(0, self.position)
+        return self.position
+
+    def read(self, size=-1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self.position
+        size = max(0, min(size, self.size - self.position))
+        if not size:
+            return b''
+        start = self.position
+        if start >= self.cache_start:
+            data = self.cache[start - self.cache_start:start - self.cache_start + size]
+        else:
+            data = self.fetch(start, start + size - 1)
+            if start + size >= self.cache_start:
+                self.cache = data + self.cache[start + size - self.cache_start:]
+                self.cache_start = start
+        self.position += len(data)
+        return data
+
+class PrefetchReader:
+    CHUNK_SIZE = 256 * 1024
+    QUEUE_DEPTH = 32
+
+    def __init__(self, response, stop_check, on_read=None) -> None:
+        self.response = response
+        self.stop_check = stop_check
+        self.on_read = on_read
+        self.queue = queue.Queue(maxsize=self.QUEUE_DEPTH)
+        self.buffer = b''
+        self.offset = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self.fill, daemon=True)
+        self.thread.start()
+
+    def fill(self) -> None:
+        try:
+            while not self.closed:
+                if self.stop_check():
+                    raise ConnectionAbortedError("Update cancelled.")
+                chunk = self.response.read(self.CHUNK_SIZE)
+                self.put(chunk)
+                if not chunk:
+                    return
+        except BaseException as e:
+            self.put(e)
+
+    def put(self, item) -> None:
+        while not self.closed:
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def read(self, size) -> bytes:
+        while self.offset >= len(self.buffer):
+            item = self.queue.get()
+            if isinstance(item, BaseException):
+                raise item
+            if not item:
+                raise ConnectionError("Connection closed before the requested range was complete.")
+            self.buffer = item
+            self.offset = 0
+        data = self.buffer[self.offset:self.offset + size]
+        self.offset += len(data)
+        if self.on_read:
+            self.on_read(len(data))
+        return data
+
+    def read_exact(self, size) -> bytes:
+        parts = []
+        while size > 0:
+            data = self.read(size)
+            parts.append(data)
+            size -= len(data)
+        return b''.join(parts)
+
+    def close(self) -> None:
+        self.closed = True
+        self.thread.join(timeout=1)
+
+class Span:
+    def __init__(self, entries, ends) -> None:
+        self.entries = entries
+        self.ends = ends
+        self.next_entry = 0
+        self.pending = 0 # bytes reported for the entry in flight
+
+    @property
+    def size(self) -> int:
+        return self.ends[-1] - self.entries[0].header_offset
+
+class StreamingInstaller:
+    MERGE_GAP = 512 * 1024
+    MAX_RETRIES = 4
+    RETRY_DELAY = 1.0
+    WRITE_SIZE = 256 * 1024
+
+    def __init__(self, url, target_path, workers=4, is_current=None, on_installed=None,
+                 stop_check=None, progress_callback=None, output_path=None, mirrors=None) -> None:
+        self.url = url
+        self.mirrors = mirrors or MirrorPool([url])
+        self.resource = url if mirrors else ''
+        self.failover = self.mirrors.failover({}, self.RETRY_DELAY, self.MAX_RETRIES)
+        self.target_path = target_path
+        self.output_path = output_path or target_path
+        self.workers = max(1, workers)
+        self.is_current = is_current or (lambda target_file, info: False)
+        self.on_installed = on_installed or (lambda info, target_file: None)
+        self.stop_check = stop_check or (lambda: False)
+        self.progress_callback = progress_callback
+        self.total_size = 0
+        self.downloaded = 0
+        self.archive_size = 0
+        self.central_directory = 0
+        self.aborted = False
+        self.lock = threading.Lock()
+
+    def should_stop(self) -> bool:
+        return self.aborted or self.stop_check()
+
+    def open(self) -> list:
+        try:
+            results = self.mirrors.head(self.resource)
+        except urllib.error.HTTPError as e:
+            if e.code in (403, 405, 501):
+                raise RangesNotSupported()
+            raise
+        agreeing = self.mirrors.agreeing(results)
+        if not agreeing:
+            raise RangesNotSupported()
+        self.archive_size = agreeing[0].size
+        self.failover = self.mirrors.failover({result.mirror: result for result in agreeing}, self.RETRY_DELAY, self.MAX_RETRIES)
+        files = self.read_directory()
+        check_paths(self.output_path, files)
+        return files
+
+    def read_directory(self) -> list:
+        error = None
+        for mirror in self.failover.sources:
+            try:
+                with zipfile.ZipFile(HttpRangeFile(mirror.url(self.resource), self.archive_size)) as zip_ref:
+                    self.central_directory = zip_ref.start_dir
+                    return zip_ref.infolist()
+            except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+                self.mirrors.fail(mirror)
+                update_trace.count("failovers")
+                error = error or e
+        raise error
+
+    def run(self, files) -> None:
+        prepare_directories(self.output_path, files)
+        entries = sorted((info for info in files if not info.is_dir()), key=lambda info: info.header_offset)
+        ends = {}
+        for info, following in zip(entries, entries[1:] + [None]):
+            ends[info.filename] = following.header_offset if following else self.central_directory
+        pending = []
+        for info in entries:
+            if self.should_stop():
+                return
+            target_file = os.path.join(self.target_path, info.filename)
+            if self.is_current(target_file, info):
+                self.on_installed(info, target_file)
+            else:
+                pending.append(info)
+        spans = self.plan_spans(pending, ends)
+        self.total_size = sum(span.size for span in spans)
+        self.downloaded = 0
+        if not spans:
+            return
+        pool = ThreadPoolExecutor(max_workers=min(self.workers, len(spans)))
+        try:
+            futures = [pool.submit(self.fetch_span, span) for span in spans]
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            self.aborted = True
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def plan_spans(self, pending, ends) -> list[Span]:
+        spans = []
+        for info in pending:
+            end = ends[info.filename]
+            if spans and info.header_offset - spans[-1].ends[-1] <= self.MERGE_GAP:
+                spans[-1].entries.append(info)
+                spans[-1].ends.append(end)
+            else:
+                spans.append(Span([info], [end]))
+        target_size = -(-sum(span.size for span in spans) // self.workers) if spans else 0
+        balanced = []
+        for span in spans:
+            current = Span([], [])
+            for info, end in zip(span.entries, span.ends):
+                current.entries.append(info)
+                current.ends.append(end)
+                if current.size >= target_size:
+                    balanced.append(current)
+                    current = Span([], [])
+            if current.entries:
+                balanced.append(current)
+        return sorted(balanced, key=lambda span: span.size, reverse=True)
+
+    def fetch_span(self, span) -> None:
+        self.failover.run(lambda mirror: self.stream_span(span, mirror), lambda: span.next_entry >= len(span.entries),
+                          self.should_stop, lambda: f"Streaming {span.entries[span.next_entry].filename}",
+                          (RangesNotSupported, zipfile.BadZipFile))
+
+    def stream_span(self, span, mirror) -> None:
+        position = span.entries[span.next_entry].header_offset
+        request = urllib.request.Request(mirror.url(self.resource), headers={"Range": f"bytes={position}-{span.ends[-1] - 1}"})
+        with urllib.request.urlopen(request, timeout=self.mirrors.transfer_timeout) as response:
+            if response.status != 206:
+                raise RangesNotSupported()
+            sample = self.mirrors.sample(mirror)
+            reader = PrefetchReader(response, self.should_stop, lambda size: self.consumed(span, mirror, sample, size))
+            try:
+                while span.next_entry < len(span.entries):
+                    if self.should_stop():
+                        return
+                    info = span.entries[span.next_entry]
+                    end = span.ends[span.next_entry]
+                    span.pending = 0
+                    try:
+                        if info.header_offset > position:
+                            reader.read_exact(info.header_offset - position)
+                            position = info.header_offset
+                        with update_trace.span("install_file", "file", path=info.filename):
+                            read = self.install_entry(reader, info)
+                        if position + read < end:
+                            reader.read_exact(end - position - read)
+                    except BaseException:
+                        with self.lock:
+                            self.downloaded -= span.pending # the entry starts over from its header
+                        raise
+                    position = end
+                    span.next_entry += 1
+            finally:
+                reader.close()
+
+    def consumed(self, span, mirror, sample, size) -> None:
+        span.pending += size
+        self.report(size)
+        if sample.add(size) and self.mirrors.should_switch(mirror, self.failover.sources):
+            raise MirrorSlow()
+
+    def install_entry(self, reader, info) -> int:
+        header = reader.read_exact(30)
+        if header[:4] != b'PK\x03\x04':
+            raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        reader.read_exact(name_length + extra_length)
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            decompressor = zlib.decompressobj(-15)
+        elif info.compress_type == zipfile.ZIP_STORED:
+            decompressor = None
+        else:
+            raise Exception(f"Unsupported compression for {info.filename}.")
+        target_file = os.path.join(self.output_path, info.filename)
+        temp_file = target_file + ".lpupd"
+        crc = 0
+        remaining = info.compress_size
+        timer = IoTimer()
+        try:
+            with open(temp_file, 'wb') as f:
+                preallocate(f, info.file_size)
+                while remaining > 0:
+                    if self.should_stop():
+                        raise ConnectionAbortedError("Update cancelled.")
+                    chunk = reader.read(min(self.WRITE_SIZE, remaining))
+                    remaining -= len(chunk)
+                    if decompressor is not None:
+                        chunk = decompressor.decompress(chunk)
+                    crc = timer.crc32(chunk, crc)
+                    timer.write(f, chunk)
+                if decompressor is not None:
+                    chunk = decompressor.flush()
+                    crc = timer.crc32(chunk, crc)
+                    timer.write(f, chunk)
+                f.truncate()
+            timer.flush()
+            if crc != info.CRC:
+                raise zipfile.BadZipFile(f"Bad CRC-32 for {info.filename}")
+            replace_file(temp_file, target_file, info.filename)
+        finally:
+            if os.path.exists(temp_file):
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+        update_trace.count("files_written")
+        update_trace.count("bytes_written", info.file_size)
+        self.on_installed(info, target_file)
+        return 30 + name_length + extra_length + info.compress_size
+
+    def report(self, size) -> None:
+        if size <= 0:
+            return
+        with self.lock:
+            self.downloaded += size
+            downloaded = self.downloaded
+        update_trace.count("download_bytes", size)
+        if self.progress_callback:
+            self.progress_callback(downloaded, self.total_size)
\ No newline at end of file
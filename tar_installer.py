@@ -0,0 +1,170 @@
+import os
+import hashlib
+import tarfile
+import urllib.request
+import urllib.error
+
+from file_io import preallocate, buffer_size, is_inside, replace_file, IoTimer
+from mirror_pool import MirrorPool
+import update_trace
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class ArchiveNotAvailable(Exception):
+    pass
+
+class ArchiveCorrupt(Exception):
+    pass
+
+class CountingReader:
+    def __init__(self, response, stop_check, progress_callback) -> None:
+        self.response = response
+        self.stop_check = stop_check
+        self.progress_callback = progress_callback
+        self.total_size = int(response.headers.get('Content-Length') or 0)
+        self.downloaded = 0
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1) -> bytes:
+        if self.stop_check():
+            raise ConnectionAbortedError("Update cancelled.")
+        data = self.response.read(size)
+        self.sha256.update(data)
+        self.downloaded += len(data)
+        update_trace.count("download_bytes", len(data))
+        if self.progress_callback:
+            self.progress_callback(self.downloaded, self.total_size)
+        return data
+
+class TarStreamInstaller:
+    READ_SIZE = 1024 * 1024
+    MAX_RETRIES = 4
+    RETRY_DELAY = 1.0
+
+    def __init__(self, url, target_path, is_current=None, on_installed=None, stop_check=None, progress_callback=None,
+                 output_path=None, mirrors=None) -> None:
+        self.url = url
+        self.mirrors = mirrors or MirrorPool([url])
+        self.resource = url if mirrors else ''
+        self.failover = self.mirrors.failover(dict.fromkeys(self.mirrors.mirrors), self.RETRY_DELAY, self.MAX_RETRIES)
+        self.target_path = target_path
+        self.output_path = output_path or target_path
+        self.is_current = is_current or (lambda target_file, size, crc32: False)
+        self.on_installed = on_installed or (lambda name, target_file, crc32: None)
+        self.stop_check = stop_check or (lambda: False)
+        self.progress_callback = progress_callback
+        self.names = []
+        self.pending = []
+
+    @classmethod
+    def supported(cls) -> bool:
+        return zstandard is not None
+
+    def open(self, url, headers=None):
+        try:
+            return urllib.request.urlopen(urllib.request.Request(url, headers=headers or {}), timeout=self.mirrors.transfer_timeout)
+        except urllib.error.HTTPError as e:
+            if e.code in (403, 404, 406, 410):
+                raise ArchiveNotAvailable()
+            raise
+
+    def fetch_checksum(self, mirror) -> str:
+        with self.open(mirror.url(self.resource) + ".sha256") as response:
+            fields = response.read().decode('utf-8', 'replace').split()
+        if not fields:
+            raise ArchiveNotAvailable()
+        return fields[0].lower()
+
+    def run(self) -> list[str]:
+        if zstandard is None:
+            raise ArchiveNotAvailable()
+        try:
+            self.failover.run(self.stream, None, self.stop_check, lambda: "Streaming the update archive",
+                              ArchiveCorrupt) # a broken stream starts over, from another mirror if there is one
+            if self.stop_check():
+                return self.names
+            self.commit()
+            return self.names
+        finally:
+            self.discard()
+
+    def stream(self, mirror) -> None:
+        self.discard()
+        self.names = []
+        expected = self.fetch_checksum(mirror)
+        response = self.open(mirror.url(self.resource), {"Accept": "application/zstd"})
+        with response:
+            reader = CountingReader(response, self.stop_check, self.progress_callback)
+            decompressor = zstandard.ZstdDecompressor()
+            try:
+                with decompressor.stream_reader(reader, read_size=self.READ_SIZE) as stream:
+                    with tarfile.open(fileobj=stream, mode='r|') as tar:
+                        for member in tar:
+                            if self.stop_check():
+                                return
+                            with update_trace.span("install_file", "file", path=member.name):
+                                self.install_member(tar, member)
+            except zstandard.ZstdError as e:
+                raise ArchiveCorrupt(f"Corrupt zstd stream: {e}")
+            except tarfile.TarError as e:
+                raise ArchiveCorrupt(f"Corrupt tar stream: {e}")
+            while reader.read(self.READ_SIZE):
+                pass
+        if reader.sha256.hexdigest() != expected:
+            raise ArchiveCorrupt("Archive checksum mismatch.")
+
+    def install_member(self, tar, member) -> None:
+        name = member.name.removeprefix('./').rstrip('/')
+        if not name:
+            return
+        if not is_inside(self.output_path, name):
+            raise ArchiveCorrupt(f"Unsafe path in archive: {name}")
+        target_file = os.path.join(self.output_path, name)
+        if member.isdir():
+            os.makedirs(target_file, exist_ok=True)
+            self.names.append(name + '/')
+            return
+        if not member.isfile():
+            return
+        os.makedirs(os.path.dirname(target_file), exist_ok=True)
+        temp_file = target_file + ".lpupd"
+        self.pending.append((temp_file, target_file, name, member.size, None))
+        crc = 0
+        timer = IoTimer()
+        with tar.extractfile(member) as source, open(temp_file, 'wb') as f:
+            preallocate(f, member.size)
+            chunk_size = buffer_size(member.size)
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                crc = timer.crc32(chunk, crc)
+                timer.write(f, chunk)
+            f.truncate()
+        timer.flush()
+        self.pending[-1] = (temp_file, target_file, name, member.size, crc)
+        self.names.append(name)
+
+    def commit(self) -> None:
+        # only once the whole archive matched its checksum does anything replace an installed file
+        for temp_file, target_file, name, size, crc in self.pending:
+            live_file = os.path.join(self.target_path, name)
+            if self.is_current(live_file, size, crc):
+                self.on_installed(name, live_file, crc)
+                continue
+            replace_file(temp_file, target_file, name)
+            update_trace.count("files_written")
+            update_trace.count("bytes_written", size)
+            self.on_installed(name, target_file, crc)
+
+    def discard(self) -> None:
+        for temp_file, *_ in self.pending:
+            if os.path.exists(temp_file):
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+        self.pending = []
\ No newline at end of file
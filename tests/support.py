@@ -0,0 +1,242 @@
+import io
+import os
+import json
+import shutil
+import struct
+import hashlib
+import tarfile
+import zipfile
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import ThreadingHTTPServer
+
+from benchmark import ReleaseHandler
+from mirror_pool import MirrorPool
+from segmented_downloader import SegmentedDownloader
+from updater_core import UpdaterCore
+
+MiB = 1024 * 1024
+
+class CountingWriter:
+    def __init__(self, wfile, limit) -> None:
+        self.wfile = wfile
+        self.limit = limit
+        self.written = 0
+
+    def write(self, data) -> int:
+        if self.limit is not None and self.written + len(data) > self.limit:
+            raise ConnectionResetError("Connection dropped by the test server.")
+        self.written += len(data)
+        return self.wfile.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.wfile, name)
+
+class ArchiveHandler(ReleaseHandler):
+    def do_HEAD(self) -> None:
+        self.server.log(self.command, self.path)
+        super().do_HEAD()
+
+    def do_GET(self) -> None:
+        self.server.log(self.command, self.path)
+        if self.headers.get('If-None-Match') and self.headers['If-None-Match'] == self.etag():
+            with self.server.lock:
+                self.server.not_modified += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        if self.server.ignore_ranges:
+            del self.headers['Range']
+        if not self.path.startswith(('/zips/', '/archives/')):
+            super().do_GET()
+            return
+        limit = self.server.drop_after
+        with self.server.lock:
+            if self.server.drop_times is not None:
+                if self.server.drop_times > 0:
+                    self.server.drop_times -= 1
+                else:
+                    limit = None
+        writer = self.wfile = CountingWriter(self.wfile, limit)
+        try:
+            super().do_GET()
+        finally:
+            with self.server.lock:
+                self.server.served += writer.written
+
+    def etag(self) -> str | None:
+        try:
+            st = os.stat(os.path.join(self.root, self.path.split('?', 1)[0].lstrip('/')))
+        except OSError:
+            return None
+        return f'"{st.st_size:x}-{st.st_mtime_ns:x}"' # as ReleaseHandler computes it
+
+class ReleaseServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root, drop_after=None, ignore_ranges=False) -> None:
+        super().__init__(('127.0.0.1', 0), type("Handler", (ArchiveHandler,), {"root": root}))
+        self.drop_after = drop_after # archive bytes sent per request before the connection is cut
+        self.drop_times = None # how many requests to cut, None for all of them
+        self.ignore_ranges = ignore_ranges # still advertises Accept-Ranges, as some CDNs do
+        self.served = 0
+        self.requests = []
+        self.not_modified = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def log(self, method, path) -> None:
+        with self.lock:
+            self.requests.append((method, path))
+
+    def handle_error(self, request, client_address) -> None:
+        pass # dropped connections are expected here
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+def random_files(count, size, folder="assets") -> dict:
+    return {f"{folder}/{i // 10:02d}/file_{i:03d}.dat": os.urandom(size) for i in range(count)}
+
+def write_release(root, version, files, manifest=False, tar=False) -> None:
+    os.makedirs(os.path.join(root, "zips"), exist_ok=True)
+    with open(os.path.join(root, "current_ver.txt"), 'w', encoding='utf-8') as f:
+        f.write(version)
+    zip_path = os.path.join(root, "zips", f"{version}.zip")
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zip_ref:
+        for rel_path, data in files.items():
+            zip_ref.writestr(rel_path, data)
+    if manifest:
+        write_manifest(root, version, files, zip_path)
+    if tar:
+        write_tar(root, version, files)
+
+def write_manifest(root, version, files, zip_path, patches=None) -> None:
+    entries = []
+    with zipfile.ZipFile(zip_path) as zip_ref, open(zip_path, 'rb') as f:
+        for info in zip_ref.infolist():
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_length, extra_length = struct.unpack('<HH', header[26:30])
+            entries.append({
+                "path": info.filename,
+                "size": info.file_size,
+                "sha256": hashlib.sha256(files[info.filename]).hexdigest(),
+                "offset": info.header_offset + 30 + name_length + extra_length,
+                "compressed_size": info.compress_size,
+                "compression": info.compress_type,
+                "patches": (patches or {}).get(info.filename, []),
+            })
+    os.makedirs(os.path.join(root, "manifests"), exist_ok=True)
+    with open(os.path.join(root, "manifests", f"{version}.json"), 'w', encoding='utf-8') as f:
+        json.dump({"version": version, "files": entries}, f)
+
+def write_tar(root, version, files, corrupt=False) -> None:
+    import zstandard
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as tar:
+        for rel_path, data in files.items():
+            info = tarfile.TarInfo("./" + rel_path)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    data = zstandard.ZstdCompressor(level=1).compress(buffer.getvalue())
+    path = os.path.join(root, "archives", f"{version}.tar.zst")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".sha256", 'w', encoding='utf-8') as f:
+        f.write(f"{hashlib.sha256(data).hexdigest()}  {version}.tar.zst\n")
+    if corrupt:
+        middle = len(data) // 2
+        data = data[:middle] + bytes(len(data) - middle)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def write_files(target_path, files) -> None:
+    for rel_path, data in files.items():
+        path = os.path.join(target_path, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+def read_files(target_path) -> dict:
+    files = {}
+    for root, dirs, names in os.walk(target_path):
+        for name in names:
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, target_path).replace('\\', '/')
+            if rel_path not in UpdaterCore.KEEP_FILES:
+                with open(path, 'rb') as f:
+                    files[rel_path] = f.read()
+    return files
+
+class UpdateTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.work_path = tempfile.mkdtemp(prefix="lp_test_")
+        self.server_root = os.path.join(self.work_path, "server")
+        self.target_path = os.path.join(self.work_path, "install")
+        os.makedirs(self.server_root)
+        os.makedirs(self.target_path)
+        environ = mock.patch.dict(os.environ, {"TEMP": os.path.join(self.work_path, "temp"),
+                                               "LOCALAPPDATA": os.path.join(self.work_path, "local")})
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.addCleanup(shutil.rmtree, self.work_path, True)
+
+    def serve(self, root=None, drop_after=None, ignore_ranges=False) -> ReleaseServer:
+        server = ReleaseServer(root or self.server_root, drop_after, ignore_ranges)
+        self.addCleanup(server.close)
+        return server
+
+    def update(self, server, **options) -> tuple[bool, str]:
+        results = []
+        options.setdefault("trace", False)
+        core = UpdaterCore(self.target_path, base_url=server.url,
+                           finished_callback=lambda success, message: results.append((success, message)), **options)
+        core.run()
+        self.assertEqual(len(results), 1)
+        return results[0]
+
+    def assertInstalled(self, files) -> None:
+        self.assertEqual(read_files(self.target_path), files)
+
+class ReleaseTestCase(UpdateTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.files = random_files(30, 64 * 1024)
+        write_release(self.server_root, "1.0", self.files)
+        self.server = self.serve()
+
+    def release(self, version, files, **kwargs) -> None:
+        self.files = files
+        write_release(self.server_root, version, files, **kwargs)
+
+class DownloadTestCase(UpdateTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.archive_path = os.path.join(self.server_root, "zips", "1.0.zip")
+        self.download_path = os.path.join(self.work_path, "update_1.0.zip")
+        self.data = self.publish(os.urandom(6 * MiB))
+
+    def publish(self, data, root=None) -> bytes:
+        path = os.path.join(root, "zips", "1.0.zip") if root else self.archive_path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return data
+
+    def download(self, servers, connections=4, downloader_class=SegmentedDownloader, **kwargs) -> SegmentedDownloader:
+        mirrors = MirrorPool([server.url for server in servers])
+        self.addCleanup(mirrors.close)
+        downloader = downloader_class("/zips/1.0.zip", self.download_path, connections=connections, mirrors=mirrors, **kwargs)
+        downloader.download()
+        return downloader
+
+    def downloaded(self) -> bytes:
+        with open(self.download_path, 'rb') as f:
+            return f.read()
\ No newline at end of file
@@ -0,0 +1,116 @@
+import os
+import zlib
+import struct
+import hashlib
+import unittest
+
+from binary_patch import MAGIC, OP_END, OP_COPY, OP_ADD, PatchError, apply_patch, create_lpdelta
+from tests.support import UpdateTestCase, random_files, write_release, write_manifest
+
+def make_patch(*ops, end=True) -> bytes:
+    body = b''
+    for op in ops:
+        if isinstance(op, bytes):
+            body += bytes([OP_ADD]) + struct.pack('<I', len(op)) + op
+        else:
+            body += bytes([OP_COPY]) + struct.pack('<QI', *op)
+    if end:
+        body += bytes([OP_END])
+    return MAGIC + zlib.compress(body)
+
+class LpdeltaTests(UpdateTestCase):
+    def write(self, name, data) -> str:
+        path = os.path.join(self.work_path, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def create(self, source, target) -> bytes:
+        create_lpdelta(self.write("old", source), self.write("new", target), os.path.join(self.work_path, "created"))
+        with open(os.path.join(self.work_path, "created"), 'rb') as f:
+            return f.read()
+
+    def apply(self, source, patch) -> bytes:
+        source_path = os.path.join(self.work_path, "source")
+        patch_path = os.path.join(self.work_path, "patch")
+        output_path = os.path.join(self.work_path, "output")
+        with open(source_path, 'wb') as f:
+            f.write(source)
+        with open(patch_path, 'wb') as f:
+            f.write(patch)
+        apply_patch("lpdelta", source_path, patch_path, output_path)
+        with open(output_path, 'rb') as f:
+            return f.read()
+
+    def test_copies_and_adds(self) -> None:
+        source = os.urandom(3 * 1024 * 1024)
+        patch = make_patch((0, 1000), b"inserted", (1000, len(source) - 1000), b"tail")
+        self.assertEqual(self.apply(source, patch), source[:1000] + b"inserted" + source[1000:] + b"tail")
+
+    def test_created_patches_round_trip(self) -> None:
+        source = os.urandom(2 * 1024 * 1024)
+        targets = {
+            "unchanged": source,
+            "inserted": source[:1000] + b"inserted" + source[1000:],
+            "deleted": source[:5000] + source[9000:],
+            "replaced": source[:300000] + os.urandom(100) + source[300100:],
+            "reordered": source[1024 * 1024:] + source[:1024 * 1024],
+            "new": os.urandom(10000),
+            "empty": b"",
+        }
+        for name, target in targets.items():
+            with self.subTest(name):
+                self.assertEqual(self.apply(source, self.create(source, target)), target)
+        with self.subTest("empty source"):
+            self.assertEqual(self.apply(b"", self.create(b"", b"data")), b"data")
+
+    def test_created_patch_only_carries_changes(self) -> None:
+        source = os.urandom(2 * 1024 * 1024)
+        patch = self.create(source, source[:1000] + b"inserted" + source[1000:] + b"tail")
+        self.assertLess(len(patch), 1024)
+
+    def test_rejects_bad_patches(self) -> None:
+        patches = {
+            "magic": b"LPDELTA0" + make_patch(b"x")[len(MAGIC):],
+            "past end": make_patch((10, 100)),
+            "truncated": make_patch(b"x", end=False),
+            "corrupt": MAGIC + b"not zlib data",
+            "unknown op": MAGIC + zlib.compress(bytes([9])),
+        }
+        for name, patch in patches.items():
+            with self.subTest(name):
+                with self.assertRaises(PatchError):
+                    self.apply(b"0123456789", patch)
+
+    def test_rejects_unknown_format(self) -> None:
+        with self.assertRaises(PatchError):
+            apply_patch("xdelta", "source", "patch", "output")
+
+class DeltaUpdateTests(UpdateTestCase):
+    def test_patches_changed_file(self) -> None:
+        files = random_files(10, 64 * 1024)
+        write_release(self.server_root, "1.0", files, manifest=True)
+        server = self.serve()
+        self.assertTrue(self.update(server)[0])
+        rel_path = sorted(files)[0]
+        old = files[rel_path]
+        files[rel_path] = old[:1000] + b"changed" + old[1000:]
+        os.makedirs(os.path.join(self.server_root, "patches"))
+        patch_path = os.path.join(self.server_root, "patches", "1.1.lpd")
+        with open(os.path.join(self.work_path, "old"), 'wb') as f:
+            f.write(old)
+        with open(os.path.join(self.work_path, "new"), 'wb') as f:
+            f.write(files[rel_path])
+        create_lpdelta(os.path.join(self.work_path, "old"), os.path.join(self.work_path, "new"), patch_path)
+        write_release(self.server_root, "1.1", files)
+        write_manifest(self.server_root, "1.1", files, os.path.join(self.server_root, "zips", "1.1.zip"), {rel_path: [{
+            "base_sha256": hashlib.sha256(old).hexdigest(), "url": "patches/1.1.lpd", "size": os.path.getsize(patch_path),
+        }]})
+        server.served = 0
+        success, message = self.update(server)
+        self.assertTrue(success, message)
+        self.assertInstalled(files)
+        self.assertEqual(server.served, 0) # nothing was taken from the archive
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,25 @@
+import os
+import unittest
+
+from tests.support import ReleaseTestCase, write_files
+
+class CleanupTests(ReleaseTestCase):
+    def test_prunes_only_indexed_files(self) -> None:
+        self.assertTrue(self.update(self.server)[0])
+        write_files(self.target_path, {"notes.txt": b"mine", "Data/save.dat": b"save"})
+        removed = sorted(self.files)[:10]
+        self.release("1.1", {rel_path: data for rel_path, data in self.files.items() if rel_path not in removed})
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertInstalled({**self.files, "notes.txt": b"mine", "Data/save.dat": b"save"})
+        self.assertFalse(os.path.exists(os.path.join(self.target_path, os.path.dirname(removed[0]))))
+
+    def test_removes_unexpected_files_without_index(self) -> None:
+        write_files(self.target_path, {"old/stale.dat": b"old", "stale.txt": b"old", "Data/save.dat": b"save"})
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertInstalled({**self.files, "Data/save.dat": b"save"})
+        self.assertFalse(os.path.exists(os.path.join(self.target_path, "old")))
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,73 @@
+import os
+import hashlib
+import unittest
+from unittest import mock
+
+from content_store import ContentStore
+from tests.support import UpdateTestCase, ReleaseTestCase, random_files
+
+class ContentStoreTests(UpdateTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.store_path = os.path.join(self.work_path, "store")
+        self.store = ContentStore(self.store_path, 1024 * 1024)
+
+    def put(self, data) -> str:
+        path = os.path.join(self.work_path, "source")
+        with open(path, 'wb') as f:
+            f.write(data)
+        sha256 = hashlib.sha256(data).hexdigest()
+        self.store.put_file(sha256, path)
+        return sha256
+
+    def get(self, sha256) -> bytes | None:
+        path = os.path.join(self.work_path, "restored")
+        if not self.store.get(sha256, path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_round_trip(self) -> None:
+        sha256 = self.put(b"content")
+        self.assertTrue(self.store.contains(sha256))
+        self.assertEqual(self.get(sha256), b"content")
+        self.store.save()
+        self.assertTrue(ContentStore(self.store_path, 1024 * 1024).contains(sha256))
+
+    def test_forgets_corrupt_object(self) -> None:
+        sha256 = self.put(b"content")
+        with open(self.store.object_path(sha256), 'wb') as f:
+            f.write(b"tampered")
+        self.assertIsNone(self.get(sha256))
+        self.assertFalse(self.store.contains(sha256))
+
+    def test_evicts_least_recently_used(self) -> None:
+        with mock.patch("content_store.time.time", side_effect=range(100, 200)):
+            first = self.put(os.urandom(600 * 1024))
+            second = self.put(os.urandom(600 * 1024))
+            self.assertIsNotNone(self.get(first))
+            self.store.evict()
+        self.assertTrue(self.store.contains(first))
+        self.assertFalse(self.store.contains(second))
+        self.assertFalse(os.path.exists(self.store.object_path(second)))
+
+    def test_keeps_manifests(self) -> None:
+        self.store.put_manifest("1.0", b'{"files": []}')
+        self.assertEqual(self.store.get_manifest("1.0"), b'{"files": []}')
+        self.assertIsNone(self.store.get_manifest("2.0"))
+
+class StoreRollbackTests(ReleaseTestCase):
+    def test_rollback_is_served_from_store(self) -> None:
+        old_files = self.files
+        self.release("1.0", old_files, manifest=True)
+        self.assertTrue(self.update(self.server, store_size=64)[0])
+        self.release("1.1", random_files(30, 64 * 1024), manifest=True)
+        self.assertTrue(self.update(self.server, store_size=64)[0])
+        self.server.served = 0
+        success, message = self.update(self.server, store_size=64, version="1.0")
+        self.assertTrue(success, message)
+        self.assertInstalled(old_files)
+        self.assertEqual(self.server.served, 0)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
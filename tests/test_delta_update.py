@@ -0,0 +1,68 @@
+import unittest
+from unittest import mock
+
+from update_manifest import ManifestEntry
+from updater_core import UpdaterCore
+from tests.support import ReleaseTestCase
+
+class DeltaUpdateTests(ReleaseTestCase):
+    def test_manifest_install(self) -> None:
+        self.release("1.1", self.files, manifest=True)
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+
+    def test_fetches_only_changed_files(self) -> None:
+        self.release("1.0", self.files, manifest=True)
+        self.assertTrue(self.update(self.server)[0])
+        changed = sorted(self.files)[0]
+        self.release("1.1", {**self.files, changed: b"changed"}, manifest=True)
+        self.server.served = 0
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+        self.assertLess(self.server.served, 1024)
+
+class DroppedConnectionTests(ReleaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.release("1.0", self.files, manifest=True)
+        self.server.drop_after = 16 * 1024
+        retry_delay = mock.patch.object(UpdaterCore, "RETRY_DELAY", 0.01)
+        retry_delay.start()
+        self.addCleanup(retry_delay.stop)
+
+    def test_retries_a_dropped_entry(self) -> None:
+        self.server.drop_times = 3
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+
+    def test_fails_over_to_another_mirror(self) -> None:
+        healthy = self.serve()
+        success, message = self.update(self.server, mirrors=[healthy.url])
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+
+    def test_reports_the_dropped_connection(self) -> None:
+        success, message = self.update(self.server)
+        self.assertFalse(success)
+        self.assertIn("failed after", message)
+        self.assertNotIn("Checksum mismatch", message)
+
+class ManifestPathTests(unittest.TestCase):
+    def entry(self, path) -> ManifestEntry:
+        return ManifestEntry.from_dict({"path": path, "size": 1, "sha256": "00", "offset": 0})
+
+    def test_accepts_relative_paths(self) -> None:
+        self.assertEqual(self.entry("Bin/game.dll").path, "Bin/game.dll")
+        self.assertEqual(self.entry("Bin\\game.dll").path, "Bin/game.dll")
+
+    def test_rejects_unsafe_paths(self) -> None:
+        for path in ("..", "../game.dll", "a/../../game.dll", "a/..", "./game.dll", "a//b", "C:/game.dll", "C:game.dll", ""):
+            with self.subTest(path=path):
+                with self.assertRaises(ValueError):
+                    self.entry(path)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,100 @@
+import io
+import os
+import zlib
+import hashlib
+import zipfile
+import unittest
+
+from file_io import (buffer_size, preallocate, copy_range, copy_stream, write_entry, entry_data_offset, is_inside,
+                     file_crc32, file_sha256, MIN_BUFFER_SIZE, MAX_BUFFER_SIZE, LARGE_ENTRY_SIZE)
+from tests.support import UpdateTestCase
+
+class FileIoTests(UpdateTestCase):
+    def write(self, name, data) -> str:
+        path = os.path.join(self.work_path, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def read(self, path) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_buffer_size_bounds(self) -> None:
+        self.assertEqual(buffer_size(0), MIN_BUFFER_SIZE)
+        self.assertEqual(buffer_size(64 * MIN_BUFFER_SIZE), 8 * MIN_BUFFER_SIZE)
+        self.assertEqual(buffer_size(1 << 40), MAX_BUFFER_SIZE)
+
+    def test_copy_range(self) -> None:
+        data = os.urandom(3 * 1024 * 1024)
+        source_path = self.write("source", data)
+        for offset, length in ((0, len(data)), (12345, 2 * 1024 * 1024 + 7), (len(data) - 10, 10), (5, 0)):
+            with self.subTest(offset=offset, length=length):
+                output = io.BytesIO()
+                with open(source_path, 'rb') as source:
+                    crc = copy_range(source, offset, length, output)
+                self.assertEqual(output.getvalue(), data[offset:offset + length])
+                self.assertEqual(crc, zlib.crc32(data[offset:offset + length]))
+
+    def test_copy_stream(self) -> None:
+        data = os.urandom(MIN_BUFFER_SIZE * 3 + 1)
+        output = io.BytesIO()
+        copy_stream(io.BytesIO(data), output, len(data))
+        self.assertEqual(output.getvalue(), data)
+
+    def test_preallocate(self) -> None:
+        path = os.path.join(self.work_path, "preallocated")
+        with open(path, 'wb') as f:
+            preallocate(f, 1024 * 1024)
+            f.write(b"head")
+            f.truncate()
+        self.assertEqual(self.read(path), b"head")
+
+    def test_write_entry(self) -> None:
+        files = {
+            "small.dat": os.urandom(1000),
+            "stored.pak": os.urandom(LARGE_ENTRY_SIZE + 1),
+            "deflated.pak": bytes(LARGE_ENTRY_SIZE * 2),
+        }
+        zip_path = os.path.join(self.work_path, "release.zip")
+        with zipfile.ZipFile(zip_path, 'w') as zip_ref:
+            for name, data in files.items():
+                zip_ref.writestr(name, data, compress_type=zipfile.ZIP_STORED if name == "stored.pak" else zipfile.ZIP_DEFLATED)
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            for info in zip_ref.infolist():
+                with self.subTest(info.filename):
+                    target_file = os.path.join(self.work_path, info.filename)
+                    write_entry(zip_ref, info, target_file)
+                    self.assertEqual(self.read(target_file), files[info.filename])
+                    if info.filename == "stored.pak":
+                        zip_ref.fp.seek(entry_data_offset(zip_ref.fp, info))
+                        self.assertEqual(zip_ref.fp.read(64), files[info.filename][:64])
+
+    def test_write_entry_checks_crc(self) -> None:
+        zip_path = os.path.join(self.work_path, "release.zip")
+        with zipfile.ZipFile(zip_path, 'w') as zip_ref:
+            zip_ref.writestr("stored.pak", bytes(LARGE_ENTRY_SIZE), compress_type=zipfile.ZIP_STORED)
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            info = zip_ref.getinfo("stored.pak")
+            info.CRC ^= 1
+            with self.assertRaises(zipfile.BadZipFile):
+                write_entry(zip_ref, info, os.path.join(self.work_path, "stored.pak"))
+
+    def test_file_hashes(self) -> None:
+        for size in (0, 1, 4096, MIN_BUFFER_SIZE - 1, MIN_BUFFER_SIZE, MIN_BUFFER_SIZE + 1, 5 * 1024 * 1024):
+            with self.subTest(size=size):
+                data = os.urandom(size)
+                path = self.write("hashed", data)
+                self.assertEqual(file_crc32(path), zlib.crc32(data))
+                self.assertEqual(file_sha256(path), hashlib.sha256(data).hexdigest())
+
+    def test_is_inside(self) -> None:
+        root = self.target_path
+        self.assertTrue(is_inside(root, "a/b.dat"))
+        self.assertTrue(is_inside(root, "a/../b.dat"))
+        for name in ("../b.dat", "a/../../b.dat", os.path.abspath(os.sep + "etc")):
+            with self.subTest(name=name):
+                self.assertFalse(is_inside(root, name))
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
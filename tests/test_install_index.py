@@ -0,0 +1,61 @@
+import os
+import unittest
+from unittest import mock
+
+from install_index import InstallIndex
+from updater_core import UpdaterCore
+from tests.support import UpdateTestCase, ReleaseTestCase, write_files
+
+class InstallIndexTests(UpdateTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        write_files(self.target_path, {"a.dat": b"a" * 100, "b/c.dat": b"c" * 10})
+        self.index = InstallIndex(self.target_path)
+        for rel_path in ("a.dat", "b/c.dat"):
+            self.index.record(rel_path, os.stat(os.path.join(self.target_path, rel_path)), crc32=1, sha256="ab")
+
+    def test_round_trip(self) -> None:
+        self.index.save()
+        loaded = InstallIndex.load(self.target_path)
+        self.assertEqual(loaded.paths(), {"a.dat", "b/c.dat"})
+        self.assertEqual(loaded.fingerprint(), self.index.fingerprint())
+        self.assertTrue(loaded.verify())
+
+    def test_lookup_misses_changed_file(self) -> None:
+        path = os.path.join(self.target_path, "a.dat")
+        self.assertIsNotNone(self.index.lookup("a.dat", os.stat(path)))
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertIsNone(self.index.lookup("a.dat", os.stat(path)))
+        self.assertFalse(self.index.verify())
+
+    def test_verify_fails_on_missing_file(self) -> None:
+        os.remove(os.path.join(self.target_path, "b", "c.dat"))
+        self.assertFalse(self.index.verify())
+
+    def test_ignores_unreadable_index(self) -> None:
+        with open(self.index.path, 'w', encoding='utf-8') as f:
+            f.write("{not json")
+        self.assertEqual(InstallIndex.load(self.target_path).paths(), set())
+
+class IndexSkipTests(ReleaseTestCase):
+    def test_update_skips_rehashing_unchanged_files(self) -> None:
+        self.assertTrue(self.update(self.server)[0])
+        self.assertEqual(InstallIndex.load(self.target_path).paths(), set(self.files))
+        changed = sorted(self.files)[0]
+        self.release("1.1", {**self.files, changed: os.urandom(1000)})
+        with mock.patch.object(UpdaterCore, "compute_crc32_file", autospec=True) as compute_crc32_file:
+            success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+        compute_crc32_file.assert_not_called()
+
+    def test_repair_rehashes(self) -> None:
+        self.assertTrue(self.update(self.server)[0])
+        with mock.patch.object(UpdaterCore, "compute_crc32_file", autospec=True, return_value=None) as compute_crc32_file:
+            success, message = self.update(self.server, repair=True)
+        self.assertTrue(success, message)
+        self.assertEqual(compute_crc32_file.call_count, len(self.files))
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
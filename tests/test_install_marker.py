@@ -0,0 +1,44 @@
+import os
+import unittest
+
+from install_marker import InstallMarker
+from tests.support import ReleaseTestCase
+
+class UpToDateTests(ReleaseTestCase):
+    def install(self) -> None:
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.server.requests.clear()
+
+    def test_no_op_run_only_asks_for_the_version(self) -> None:
+        self.install()
+        marker = InstallMarker.load(self.target_path)
+        self.assertEqual(marker.version, "1.0")
+        self.assertIsNotNone(marker.etag)
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertIn("already installed", message)
+        self.assertEqual(self.server.requests, [("GET", "/current_ver.txt")])
+        self.assertEqual(self.server.not_modified, 1)
+
+    def test_changed_file_is_repaired(self) -> None:
+        self.install()
+        changed = sorted(self.files)[0]
+        with open(os.path.join(self.target_path, changed), 'wb') as f:
+            f.write(b"tampered")
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertNotIn("already installed", message)
+        self.assertInstalled(self.files)
+
+    def test_new_version_is_installed(self) -> None:
+        self.install()
+        self.release("1.1", {**self.files, "new.dat": b"new"})
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertIn("1.1", message)
+        self.assertInstalled(self.files)
+        self.assertEqual(InstallMarker.load(self.target_path).version, "1.1")
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,83 @@
+import os
+import unittest
+from unittest import mock
+
+from mirror_pool import MirrorPool, HeadResult
+from segmented_downloader import SegmentedDownloader
+from streaming_installer import StreamingInstaller
+from tests.support import DownloadTestCase, ReleaseTestCase, MiB
+
+class MirrorPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pool = MirrorPool(["http://a.invalid", "http://b.invalid/", "http://a.invalid/", "http://c.invalid"])
+        self.a, self.b, self.c = self.pool.mirrors
+
+    def test_deduplicates_mirrors(self) -> None:
+        self.assertEqual([mirror.base_url for mirror in self.pool.mirrors], ["http://a.invalid", "http://b.invalid", "http://c.invalid"])
+
+    def test_agreeing_takes_the_majority_size(self) -> None:
+        results = [HeadResult(self.a, 10, True, '"x"', None), HeadResult(self.b, 20, True, '"y"', None),
+                   HeadResult(self.c, 20, True, '"y"', None)]
+        self.assertEqual([result.mirror for result in self.pool.agreeing(results)], [self.b, self.c])
+        self.assertEqual(self.pool.agreeing([HeadResult(self.a, 10, False, None, None)]), [])
+
+    def test_acquire_prefers_faster_and_skips_failed_mirrors(self) -> None:
+        self.pool.record(self.a, MiB, 1.0)
+        self.pool.record(self.b, 10 * MiB, 1.0)
+        self.pool.record(self.c, 20 * MiB, 1.0)
+        self.pool.fail(self.c)
+        mirror = self.pool.acquire(self.pool.mirrors)
+        self.assertIs(mirror, self.b)
+        self.pool.release(mirror)
+        self.assertFalse(self.pool.ready([self.c]))
+
+    def test_switches_away_from_a_slow_mirror(self) -> None:
+        for mirror, rate in ((self.a, MiB), (self.b, 10 * MiB)):
+            self.pool.record_latency(mirror, 0.01)
+            self.pool.record(mirror, rate, 1.0)
+            mirror.active = 1
+        self.assertTrue(self.pool.should_switch(self.a, [self.a, self.b]))
+        self.assertFalse(self.pool.should_switch(self.b, [self.a, self.b]))
+
+class MirrorFailoverTests(DownloadTestCase):
+    def test_fails_over_to_another_mirror(self) -> None:
+        self.data = self.publish(os.urandom(12 * MiB))
+        flaky = self.serve(drop_after=MiB // 2)
+        steady = self.serve()
+        with mock.patch.object(SegmentedDownloader, "RETRY_DELAY", 0.05):
+            self.download([flaky, steady])
+        self.assertEqual(self.downloaded(), self.data)
+        self.assertGreater(steady.served, 0)
+
+    def test_skips_unreachable_mirror(self) -> None:
+        steady = self.serve()
+        dead = self.serve()
+        dead.close()
+        self.download([dead, steady])
+        self.assertEqual(self.downloaded(), self.data)
+
+    def test_ignores_mirror_with_different_archive(self) -> None:
+        other_root = os.path.join(self.work_path, "other")
+        self.publish(os.urandom(len(self.data) // 2), other_root)
+        other = self.serve(other_root)
+        self.download([other, self.serve(), self.serve()])
+        self.assertEqual(self.downloaded(), self.data)
+        self.assertEqual(other.served, 0)
+
+class StreamingFailoverTests(ReleaseTestCase):
+    def test_stream_install_fails_over(self) -> None:
+        flaky = self.serve(drop_after=256 * 1024)
+        with mock.patch.object(StreamingInstaller, "RETRY_DELAY", 0.05):
+            success, message = self.update(flaky, mirrors=[self.server.url])
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+
+    def test_version_race_picks_a_mirror(self) -> None:
+        dead = self.serve()
+        dead.close()
+        success, message = self.update(dead, mirrors=[self.server.url])
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,54 @@
+import os
+import zipfile
+import unittest
+
+from parallel_extractor import ParallelExtractor, prepare_directories
+from tests.support import UpdateTestCase, ReleaseTestCase, random_files, write_release, read_files
+
+class ParallelExtractorTests(UpdateTestCase):
+    def extract(self, files, **kwargs) -> list:
+        zip_path = os.path.join(self.work_path, "release.zip")
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+            for rel_path, data in files.items():
+                zip_ref.writestr(rel_path, data, compress_type=zipfile.ZIP_STORED if len(data) % 2 else zipfile.ZIP_DEFLATED)
+        installed = []
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            entries = zip_ref.infolist()
+        ParallelExtractor(zip_path, self.target_path, workers=4,
+                          on_installed=lambda info, target_file: installed.append(info.filename), **kwargs).run(entries)
+        return installed
+
+    def test_extracts_small_and_large_entries(self) -> None:
+        files = {**random_files(40, 4096), "big/stored.pak": os.urandom(9 * 1024 * 1024 + 1), "big/deflated.pak": bytes(9 * 1024 * 1024)}
+        installed = self.extract(files)
+        self.assertEqual(sorted(installed), sorted(files))
+        self.assertInstalled(files)
+
+    def test_skips_current_files(self) -> None:
+        files = random_files(10, 4096)
+        skipped = sorted(files)[0]
+        self.extract(files, is_current=lambda target_file, info: info.filename == skipped)
+        self.assertNotIn(skipped, read_files(self.target_path))
+
+    def test_prepare_directories_checks_first(self) -> None:
+        files = [zipfile.ZipInfo("assets/a.dat"), zipfile.ZipInfo("../evil/b.dat")]
+        with self.assertRaises(zipfile.BadZipFile):
+            prepare_directories(self.target_path, files)
+        self.assertFalse(os.path.exists(os.path.join(self.target_path, "assets")))
+        self.assertFalse(os.path.exists(os.path.join(self.work_path, "evil")))
+
+class ZipInstallTests(ReleaseTestCase):
+    def test_zip_install(self) -> None:
+        success, message = self.update(self.server, stream_install=False)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+
+    def test_rejects_unsafe_paths(self) -> None:
+        write_release(self.server_root, "1.1", {"ok.txt": b"ok", "../evil/evil.txt": b"evil"})
+        success, message = self.update(self.server, stream_install=False)
+        self.assertFalse(success)
+        self.assertFalse(os.path.exists(os.path.join(self.work_path, "evil")))
+        self.assertFalse(os.path.exists(os.path.join(self.target_path, "ok.txt")))
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
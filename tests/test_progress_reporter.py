@@ -0,0 +1,59 @@
+import unittest
+from unittest import mock
+
+from progress_reporter import ProgressReporter, ProgressInfo
+
+class ProgressReporterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 100.0
+        clock = mock.patch("progress_reporter.time.monotonic", side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.infos = []
+        self.phases = []
+        self.reporter = ProgressReporter(self.infos.append, self.phases.append)
+
+    def test_rate_limits_updates(self) -> None:
+        self.reporter.start_phase("download", 1000)
+        self.infos.clear()
+        for done in range(10, 100, 10):
+            self.now += 0.01
+            self.reporter.update(done)
+        self.assertEqual(self.infos, [])
+        self.now += 0.1
+        self.reporter.advance(10)
+        self.assertEqual(len(self.infos), 1)
+        self.assertEqual(self.infos[0].done, 100)
+
+    def test_reports_rate_and_eta(self) -> None:
+        self.reporter.start_phase("download", 1000)
+        self.now += 1.0
+        self.reporter.update(100)
+        info = self.infos[-1]
+        self.assertAlmostEqual(info.rate, 100.0)
+        self.assertAlmostEqual(info.eta, 9.0)
+        self.assertEqual(info.percent, 10)
+        self.now += 1.0
+        self.reporter.update(400)
+        self.assertAlmostEqual(self.infos[-1].rate, 0.3 * 300 + 0.7 * 100) # smoothed
+
+    def test_flush_always_reports(self) -> None:
+        self.reporter.start_phase("extract", 10)
+        self.reporter.advance(10)
+        self.reporter.flush()
+        self.assertEqual(self.infos[-1].done, 10)
+        self.assertEqual(self.infos[-1].percent, 100)
+        self.assertIsNone(self.infos[-1].eta)
+
+    def test_announces_phase_changes_once(self) -> None:
+        self.reporter.start_phase("check", 5)
+        self.reporter.start_phase("check", 5)
+        self.reporter.start_phase("download")
+        self.assertEqual(self.phases, ["check", "download"])
+
+    def test_percent_is_clamped(self) -> None:
+        self.assertEqual(ProgressInfo("download", 5, 0, 0.0, None).percent, 0)
+        self.assertEqual(ProgressInfo("download", 150, 100, 0.0, None).percent, 100)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
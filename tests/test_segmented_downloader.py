@@ -0,0 +1,80 @@
+import os
+import unittest
+from unittest import mock
+
+from segmented_downloader import SegmentedDownloader, ArchiveChanged
+from tests.support import DownloadTestCase, ReleaseTestCase, MiB
+
+class ChangingDownloader(SegmentedDownloader):
+    def __init__(self, *args, on_probe=None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.probes = 0
+        self.on_probe = on_probe
+
+    def probe(self) -> tuple[int, bool]:
+        result = super().probe()
+        self.probes += 1
+        if self.probes == 1:
+            self.on_probe()
+        return result
+
+class ResumeTests(DownloadTestCase):
+    def test_resumes_from_sidecar(self) -> None:
+        server = self.serve(drop_after=int(2.5 * MiB))
+        with mock.patch.object(SegmentedDownloader, "MAX_RETRIES", 0):
+            with self.assertRaises(Exception):
+                self.download([server], connections=1)
+        self.assertTrue(os.path.exists(self.download_path + SegmentedDownloader.STATE_SUFFIX))
+        server.drop_after = None
+        server.served = 0
+        self.download([server], connections=1)
+        self.assertEqual(self.downloaded(), self.data)
+        self.assertLessEqual(server.served, 4 * MiB + 4096) # the two verified blocks were not fetched again
+        self.assertFalse(os.path.exists(self.download_path + SegmentedDownloader.STATE_SUFFIX))
+
+    def test_ignores_sidecar_of_changed_archive(self) -> None:
+        server = self.serve(drop_after=int(2.5 * MiB))
+        with mock.patch.object(SegmentedDownloader, "MAX_RETRIES", 0):
+            with self.assertRaises(Exception):
+                self.download([server], connections=1)
+        self.data = self.publish(os.urandom(len(self.data)))
+        os.utime(self.archive_path, ns=(0, os.stat(self.archive_path).st_mtime_ns + 10**9))
+        server.drop_after = None
+        self.download([server], connections=1)
+        self.assertEqual(self.downloaded(), self.data)
+
+    def test_restarts_when_archive_changes(self) -> None:
+        server = self.serve()
+        def change_archive():
+            self.data = self.publish(os.urandom(len(self.data) + MiB))
+        downloader = self.download([server], downloader_class=ChangingDownloader, on_probe=change_archive)
+        self.assertEqual(downloader.probes, 2)
+        self.assertEqual(downloader.total_size, len(self.data))
+        self.assertEqual(self.downloaded(), self.data)
+
+    def test_archive_changed_message(self) -> None:
+        self.assertIn("changed on the server", str(ArchiveChanged()))
+
+    def test_falls_back_when_ranges_are_ignored(self) -> None:
+        server = self.serve(ignore_ranges=True)
+        self.download([server])
+        self.assertEqual(self.downloaded(), self.data)
+        self.assertFalse(os.path.exists(self.download_path + SegmentedDownloader.STATE_SUFFIX))
+
+class IgnoredRangesTests(ReleaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.server.ignore_ranges = True
+
+    def test_streamed_update(self) -> None:
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+
+    def test_downloaded_update(self) -> None:
+        success, message = self.update(self.server, stream_install=False)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
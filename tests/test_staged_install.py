@@ -0,0 +1,86 @@
+import os
+import unittest
+from unittest import mock
+
+from staged_install import StagedInstall
+from tests.support import UpdateTestCase, ReleaseTestCase, write_files, read_files
+
+class StagedUpdateTests(ReleaseTestCase):
+    def test_stops_launcher_once(self) -> None:
+        before_commit = mock.Mock()
+        success, message = self.update(self.server, staged=True, before_commit=before_commit)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+        before_commit.assert_called_once()
+        self.assertFalse(os.path.exists(StagedInstall(self.target_path).staging_path))
+        before_commit.reset_mock()
+        self.assertTrue(self.update(self.server, staged=True, before_commit=before_commit)[0])
+        before_commit.assert_not_called()
+
+    def test_fallback_stops_launcher(self) -> None:
+        before_commit = mock.Mock()
+        with mock.patch.object(StagedInstall, "prepare", side_effect=PermissionError("read-only")):
+            success, message = self.update(self.server, staged=True, before_commit=before_commit)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+        before_commit.assert_called_once()
+
+class StagedCommitTests(UpdateTestCase):
+    def stage(self, state=None) -> StagedInstall:
+        write_files(self.target_path, {"bin/game.dll": b"old", "keep.txt": b"keep"})
+        staged = StagedInstall(self.target_path)
+        staged.prepare()
+        write_files(staged.staging_path, {"bin/game.dll": b"new", "bin/new/extra.dat": b"extra"})
+        if state:
+            staged.write_journal({
+                "state": state,
+                "staging": staged.staging_path,
+                "backup": staged.backup_path,
+                "directories": ["bin", "bin/new"],
+                "files": ["bin/game.dll", "bin/new/extra.dat"],
+            })
+        return staged
+
+    def test_commit(self) -> None:
+        staged = self.stage()
+        staged.commit()
+        self.assertInstalled({"bin/game.dll": b"new", "bin/new/extra.dat": b"extra", "keep.txt": b"keep"})
+        self.assertFalse(os.path.exists(staged.journal_path))
+        self.assertFalse(os.path.exists(staged.backup_path))
+
+    def test_failed_commit_rolls_back(self) -> None:
+        staged = self.stage()
+        swap = StagedInstall.swap
+        def failing_swap(self, rel_path):
+            if rel_path == "bin/new/extra.dat":
+                raise OSError("disk full")
+            swap(self, rel_path)
+        with mock.patch.object(StagedInstall, "swap", failing_swap):
+            with self.assertRaisesRegex(Exception, "Failed to apply update"):
+                staged.commit()
+        self.assertInstalled({"bin/game.dll": b"old", "keep.txt": b"keep"})
+        self.assertFalse(os.path.exists(staged.journal_path))
+
+    def test_finishes_interrupted_commit(self) -> None:
+        staged = self.stage("committing")
+        StagedInstall.recover(self.target_path)
+        self.assertInstalled({"bin/game.dll": b"new", "bin/new/extra.dat": b"extra", "keep.txt": b"keep"})
+        self.assertFalse(os.path.exists(staged.journal_path))
+        self.assertFalse(os.path.exists(staged.staging_path))
+        self.assertFalse(os.path.exists(staged.backup_path))
+
+    def test_drops_uncommitted_staging(self) -> None:
+        staged = self.stage("prepared")
+        StagedInstall.recover(self.target_path)
+        self.assertInstalled({"bin/game.dll": b"old", "keep.txt": b"keep"})
+        self.assertFalse(os.path.exists(staged.journal_path))
+        self.assertFalse(os.path.exists(staged.staging_path))
+
+    def test_update_recovers_first(self) -> None:
+        self.stage("committing")
+        success, message = self.update(self.serve()) # nothing to fetch, the journal is replayed before that
+        self.assertFalse(success)
+        self.assertEqual(read_files(self.target_path)["bin/game.dll"], b"new")
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,80 @@
+import os
+import zipfile
+import unittest
+from unittest import mock
+
+from streaming_installer import StreamingInstaller
+from mirror_pool import MirrorPool
+from tests.support import ReleaseTestCase, write_release, MiB
+
+class StreamingInstallTests(ReleaseTestCase):
+    def test_stream_install(self) -> None:
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertIn("already installed", message)
+
+    def test_fetches_only_changed_entries(self) -> None:
+        self.assertTrue(self.update(self.server)[0])
+        changed = sorted(self.files)[0]
+        self.release("1.1", {**self.files, changed: b"changed"})
+        self.server.served = 0
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+        self.assertLess(self.server.served, 512 * 1024) # the directory tail and one small entry
+
+class LargeEntryTests(ReleaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.data = os.urandom(8 * MiB)
+        self.release("1.1", {"big.dat": self.data})
+        self.events = []
+
+    def install(self) -> None:
+        mirrors = MirrorPool([self.server.url])
+        self.addCleanup(mirrors.close)
+        installer = StreamingInstaller("/zips/1.1.zip", self.target_path, mirrors=mirrors,
+                                       progress_callback=lambda downloaded, total: self.events.append((downloaded, total)),
+                                       on_installed=lambda info, target_file: self.events.append(info.filename))
+        installer.run(installer.open())
+
+    def test_reports_progress_within_an_entry(self) -> None:
+        self.install()
+        self.assertInstalled(self.files)
+        self.assertEqual(self.events[-1], "big.dat")
+        self.assertGreater(len(self.events), 8) # one call per chunk, not one per entry
+        downloaded, total = self.events[-2]
+        self.assertEqual(downloaded, total)
+
+    def test_switches_mirror_within_an_entry(self) -> None:
+        with mock.patch.object(MirrorPool, "should_switch", side_effect=[True] + [False] * 100):
+            self.install()
+        self.assertInstalled(self.files)
+        self.assertGreater(self.server.served, len(self.data) + MiB) # the entry was restarted after the first sample
+        self.assertLessEqual(max(event[0] for event in self.events if isinstance(event, tuple)), self.events[-2][1])
+
+class ZipSlipTests(ReleaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        write_release(self.server_root, "1.1", {"ok.txt": b"ok", "../evil/evil.txt": b"evil"})
+
+    def assertNothingEscaped(self) -> None:
+        self.assertFalse(os.path.exists(os.path.join(self.work_path, "evil")))
+        self.assertFalse(os.path.exists(os.path.join(self.target_path, "ok.txt")))
+
+    def test_rejects_unsafe_paths(self) -> None:
+        success, message = self.update(self.server)
+        self.assertFalse(success)
+        self.assertNothingEscaped()
+
+    def test_open_rejects_unsafe_paths(self) -> None:
+        mirrors = MirrorPool([self.server.url])
+        self.addCleanup(mirrors.close)
+        with self.assertRaises(zipfile.BadZipFile):
+            StreamingInstaller("/zips/1.1.zip", self.target_path, mirrors=mirrors).open()
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,54 @@
+import os
+import unittest
+
+from tar_installer import TarStreamInstaller
+from tests.support import ReleaseTestCase, write_files, write_tar
+
+@unittest.skipUnless(TarStreamInstaller.supported(), "zstandard is not installed")
+class TarStreamTests(ReleaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.release("1.0", self.files, tar=True)
+
+    def archive_requests(self, server=None) -> list:
+        return [path for method, path in (server or self.server).requests
+                if method == "GET" and path.startswith(('/zips/', '/archives/')) and not path.endswith(".sha256")]
+
+    def test_fresh_install(self) -> None:
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+        self.assertEqual(self.archive_requests(), ["/archives/1.0.tar.zst"])
+
+    def test_corrupt_archive_falls_back_to_zip(self) -> None:
+        write_tar(self.server_root, "1.0", self.files, corrupt=True)
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+
+    def test_corrupt_archive_installs_nothing(self) -> None:
+        write_tar(self.server_root, "1.0", self.files, corrupt=True)
+        os.remove(os.path.join(self.server_root, "zips", "1.0.zip"))
+        success, message = self.update(self.server)
+        self.assertFalse(success, message)
+        self.assertInstalled({})
+
+    def test_existing_install_without_index_uses_zip(self) -> None:
+        changed = sorted(self.files)[0]
+        write_files(self.target_path, self.files) # as left behind by an updater that kept no index
+        self.release("1.1", {**self.files, changed: b"changed"}, tar=True)
+        success, message = self.update(self.server)
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+        self.assertNotIn("/archives/1.1.tar.zst", self.archive_requests())
+
+    def test_fails_over_to_another_mirror(self) -> None:
+        self.server.drop_after = 64 * 1024
+        healthy = self.serve()
+        success, message = self.update(self.server, mirrors=[healthy.url])
+        self.assertTrue(success, message)
+        self.assertInstalled(self.files)
+        self.assertEqual(self.archive_requests(healthy), ["/archives/1.0.tar.zst"])
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,31 @@
+import unittest
+
+import update_trace
+from tests.support import ReleaseTestCase
+
+class TraceTests(ReleaseTestCase):
+    def test_records_io_timings_when_streaming(self) -> None:
+        success, message = self.update(self.server, trace=True)
+        self.assertTrue(success, message)
+        self.assertGreater(update_trace.tracer.timings.get("hashing", 0), 0)
+        self.assertGreater(update_trace.tracer.timings.get("writing", 0), 0)
+
+    def test_records_io_timings_from_manifest(self) -> None:
+        self.release("1.1", self.files, manifest=True)
+        success, message = self.update(self.server, trace=True)
+        self.assertTrue(success, message)
+        self.assertGreater(update_trace.tracer.timings.get("hashing", 0), 0)
+        self.assertGreater(update_trace.tracer.timings.get("writing", 0), 0)
+
+    def test_records_file_spans_only_on_request(self) -> None:
+        self.assertTrue(self.update(self.server, trace=True)[0])
+        categories = {event["cat"] for event in update_trace.tracer.events}
+        self.assertIn("phase", categories)
+        self.assertNotIn("file", categories)
+        self.release("1.1", self.files)
+        self.assertTrue(self.update(self.server, trace=True, trace_files=True)[0])
+        files = [event for event in update_trace.tracer.events if event["cat"] == "file"]
+        self.assertGreaterEqual(len(files), len(self.files))
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
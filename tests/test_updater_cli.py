@@ -0,0 +1,48 @@
+import os
+import unittest
+from unittest import mock
+
+import updater_cli
+from updater_cli import check_args, kill_launcher, run_headless
+from tests.support import ReleaseTestCase
+
+class CliTests(unittest.TestCase):
+    def test_reports_unknown_arguments(self) -> None:
+        with self.assertRaisesRegex(Exception, "Invalid arguments"):
+            check_args([os.getcwd(), "--no-such-option"])
+
+    def test_reports_bad_values(self) -> None:
+        with self.assertRaisesRegex(Exception, "Invalid arguments"):
+            check_args([os.getcwd(), "--workers", "many"])
+
+    def test_reports_missing_target(self) -> None:
+        with self.assertRaisesRegex(Exception, "Missing target path"):
+            check_args([])
+
+    def test_headless_fails_on_unknown_arguments(self) -> None:
+        with mock.patch("sys.stderr"):
+            self.assertEqual(run_headless([os.getcwd(), "--no-such-option"]), 1)
+
+    def test_collects_mirrors(self) -> None:
+        args = check_args([os.getcwd(), "--mirror", "https://a.example", "--mirror", "https://b.example"])
+        self.assertEqual(args.mirrors, ["https://a.example", "https://b.example"])
+
+    def test_file_spans_are_opt_in(self) -> None:
+        self.assertFalse(check_args([os.getcwd()]).trace_files)
+        self.assertTrue(check_args([os.getcwd(), "--trace"]).trace_files)
+
+    @unittest.skipIf(os.name == 'nt', "taskkill only exists on Windows")
+    def test_kill_launcher_skipped_off_windows(self) -> None:
+        with mock.patch.object(updater_cli.subprocess, "Popen") as popen:
+            kill_launcher(wait=True)
+        popen.assert_not_called()
+
+class HeadlessTests(ReleaseTestCase):
+    def test_headless_update(self) -> None:
+        with mock.patch("sys.stdout"), mock.patch.object(updater_cli, "kill_launcher") as kill:
+            self.assertEqual(run_headless([self.target_path, "--base-url", self.server.url, "--no-trace"]), 0)
+        kill.assert_called_once()
+        self.assertInstalled(self.files)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
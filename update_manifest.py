@@ -0,0 +1,112 @@
+import json
+import http.client
+import urllib.request
+import urllib.error
+import urllib.parse
+
+class PatchInfo:
+    def __init__(self, base_sha256, url, size, patch_format="lpdelta") -> None:
+        self.base_sha256 = base_sha256
+        self.url = url
+        self.size = size
+        self.format = patch_format
+
+    @classmethod
+    def from_dict(cls, data) -> "PatchInfo":
+        return cls(data["base_sha256"].lower(), data["url"], int(data["size"]), data.get("format", "lpdelta"))
+
+class ManifestEntry:
+    def __init__(self, path, size, sha256, url=None, offset=None, compressed_size=None, compression=0, patches=None) -> None:
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.url = url
+        self.offset = offset
+        self.compressed_size = compressed_size
+        self.compression = compression
+        self.patches = patches or []
+
+    @classmethod
+    def from_dict(cls, data) -> "ManifestEntry":
+        path = data["path"].replace('\\', '/').strip('/')
+        if not path or any(part in ('', '.', '..') or ':' in part for part in path.split('/')):
+            raise ValueError(f"Invalid manifest path: {data['path']}") # also rules out drive paths such as C:foo
+        entry = cls(
+            path,
+            int(data["size"]),
+            data["sha256"].lower(),
+            url=data.get("url"),
+            offset=data.get("offset"),
+            compressed_size=data.get("compressed_size"),
+            compression=int(data.get("compression", 0)),
+            patches=[PatchInfo.from_dict(item) for item in data.get("patches", [])],
+        )
+        if entry.url is None and entry.offset is None:
+            raise ValueError(f"Manifest entry has no source: {path}")
+        if entry.url is None and entry.compressed_size is None:
+            entry.compressed_size = entry.size
+        return entry
+
+    @property
+    def transfer_size(self) -> int:
+        return self.size if self.url else self.compressed_size
+
+    def find_patch(self, base_sha256, formats) -> PatchInfo | None:
+        for patch in self.patches:
+            if patch.base_sha256 == base_sha256 and patch.format in formats:
+                return patch
+        return None
+
+class UpdateManifest:
+    def __init__(self, version, entries, archive=None) -> None:
+        self.version = version
+        self.entries = entries
+        self.archive = archive
+
+    @classmethod
+    def from_dict(cls, data) -> "UpdateManifest":
+        entries = [ManifestEntry.from_dict(item) for item in data["files"]]
+        return cls(data.get("version"), entries, data.get("archive"))
+
+    def expected_paths(self) -> set:
+        paths = set()
+        for entry in self.entries:
+            parts = entry.path.split('/')
+            for idx in range(1, len(parts) + 1):
+                paths.add('/'.join(parts[:idx]))
+        return paths
+
+    def entry_url(self, base_url, entry) -> str:
+        return resolve_url(base_url, entry.url)
+
+    def archive_url(self, base_url) -> str:
+        return resolve_url(base_url, self.archive or f"zips/{self.version}.zip")
+
+def resolve_url(base_url, url) -> str:
+    if urllib.parse.urlsplit(url).scheme:
+        return url
+    return urllib.parse.urljoin(base_url.rstrip('/') + '/', urllib.parse.quote(url, safe="/%"))
+
+def fetch_manifest(base_url, version, store=None, connection=None) -> UpdateManifest | None:
+    url = f"{base_url}/manifests/{version}.json"
+    try:
+        if connection is not None:
+            status, _, raw = connection.get(f"/manifests/{version}.json")
+            if status != 200:
+                raise urllib.error.HTTPError(url, status, "Manifest not available", None, None)
+        else:
+            with urllib.request.urlopen(url, timeout=10) as response:
+                raw = response.read()
+    except (urllib.error.URLError, http.client.HTTPException, OSError):
+        raw = store.get_manifest(version) if store is not None else None
+        if raw is None:
+            return None
+    try:
+        manifest = UpdateManifest.from_dict(json.loads(raw.decode('utf-8')))
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+    if not manifest.version:
+        manifest.version = version
+    if store is not None:
+        store.put_manifest(version, raw)
+    return manifest
\ No newline at end of file
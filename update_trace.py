@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import platform
+import tempfile
+import threading
+import traceback
+
+class NullSpan:
+    def __enter__(self) -> "NullSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.tracer.add_event(self.name, self.category, self.start, time.perf_counter(), self.args)
+        return False
+
+class UpdateTracer:
+    DIR_NAME = "LP_Upd_Trace"
+    MAX_EVENTS = 200000
+    KEEP_TRACES = 10
+    DETAIL_CATEGORIES = {"file"} # one span per installed file, only recorded on request
+
+    def __init__(self, enabled=False, profile=False, detailed=False) -> None:
+        self.enabled = enabled
+        self.detailed = enabled and (detailed or profile)
+        self.origin = time.perf_counter()
+        self.started = time.time()
+        self.events = []
+        self.dropped_events = 0
+        self.counters = {}
+        self.timings = {}
+        self.info = {}
+        self.error = None
+        self.phase = None
+        self.phase_start = 0.0
+        self.lock = threading.Lock()
+        self.profiler = cProfile.Profile() if enabled and profile else None
+
+    @classmethod
+    def trace_dir(cls) -> str:
+        return os.path.join(os.environ.get('TEMP') or tempfile.gettempdir(), cls.DIR_NAME)
+
+    def span(self, name, category="update", **args) -> Span | NullSpan:
+        if not self.enabled or (category in self.DETAIL_CATEGORIES and not self.detailed):
+            return NULL_SPAN
+        return Span(self, name, category, args)
+
+    def add_event(self, name, category, start, end, args) -> None:
+        if len(self.events) >= self.MAX_EVENTS:
+            self.dropped_events += 1
+            return
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self.origin) * 1000000, 1),
+            "dur": round((end - start) * 1000000, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "args": args,
+        })
+
+    def count(self, name, amount=1) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_time(self, name, seconds) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def set_info(self, **info) -> None:
+        if self.enabled:
+            self.info.update(info)
+
+    def begin_phase(self, phase) -> None:
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.phase is not None:
+            self.add_event(self.phase, "phase", self.phase_start, now, {})
+        self.phase = phase
+        self.phase_start = now
+
+    def start_profile(self) -> None:
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop_profile(self) -> None:
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def record_error(self, error) -> None:
+        if self.enabled:
+            self.error = "".join(traceback.format_exception(error))
+
+    def save(self) -> str | None:
+        if not self.enabled:
+            return None
+        self.begin_phase(None)
+        trace_dir = self.trace_dir()
+        name = time.strftime("update_%Y%m%d_%H%M%S", time.localtime(self.started)) + f"{int(self.started * 1000) % 1000:03d}_{os.getpid()}"
+        path = os.path.join(trace_dir, name + ".json")
+        data = {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "started": self.started,
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "info": self.info,
+                "counters": self.counters,
+                "timings": {key: round(value, 6) for key, value in self.timings.items()},
+                "dropped_events": self.dropped_events,
+                "error": self.error,
+            },
+        }
+        try:
+            os.makedirs(trace_dir, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            if self.profiler is not None:
+                pstats.Stats(self.profiler).dump_stats(os.path.join(trace_dir, name + ".prof"))
+        except OSError:
+            return None
+        self.prune(trace_dir)
+        return path
+
+    def prune(self, trace_dir) -> None:
+        try:
+            names = sorted(name for name in os.listdir(trace_dir) if name.startswith("update_") and name.endswith(".json"))
+        except OSError:
+            return
+        for name in names[:-self.KEEP_TRACES]:
+            for suffix in (".json", ".prof"):
+                try:
+                    os.remove(os.path.join(trace_dir, name[:-5] + suffix))
+                except OSError:
+                    pass
+
+tracer = UpdateTracer()
+
+def begin(enabled=True, profile=False, detailed=False) -> UpdateTracer:
+    global tracer
+    tracer = UpdateTracer(enabled, profile, detailed)
+    return tracer
+
+def span(name, category="update", **args) -> Span | NullSpan:
+    return tracer.span(name, category, **args)
+
+def count(name, amount=1) -> None:
+    tracer.count(name, amount)
+
+def add_time(name, seconds) -> None:
+    tracer.add_time(name, seconds)
\ No newline at end of file
@@ -0,0 +1,99 @@
+import sys
+import os
+import argparse
+import subprocess
+import threading
+
+from updater_core import UpdaterCore
+
+class ArgumentParser(argparse.ArgumentParser):
+    def error(self, message) -> None:
+        raise argparse.ArgumentError(None, message) # the GUI has no console to print usage to
+
+def kill_launcher(wait=False) -> None:
+    if os.name != 'nt':
+        return
+    process = subprocess.Popen(
+        ["taskkill", "/F", "/IM", "LegacyPlay_Launcher.exe"],
+        creationflags=subprocess.CREATE_NO_WINDOW
+    )
+    if wait:
+        process.wait()
+
+def parse_args(argv) -> argparse.Namespace:
+    parser = ArgumentParser(prog="LegacyPlay_Updater", exit_on_error=False)
+    parser.add_argument("target_path", nargs="?")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-stream", dest="stream_install", action="store_false")
+    parser.add_argument("--staged", action="store_true")
+    parser.add_argument("--store-size", type=int, default=0, metavar="MB")
+    parser.add_argument("--version", default=None)
+    parser.add_argument("--repair", action="store_true")
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--mirror", action="append", dest="mirrors", default=None, metavar="URL")
+    parser.add_argument("--no-trace", dest="trace", action="store_false")
+    parser.add_argument("--trace", dest="trace_files", action="store_true")
+    parser.add_argument("--profile", action="store_true")
+    return parser.parse_args(argv)
+
+def check_args(argv) -> argparse.Namespace:
+    try:
+        args = parse_args(argv)
+    except argparse.ArgumentError as e:
+        raise Exception(f"Invalid arguments: {e}")
+    if not args.target_path:
+        raise Exception("Missing target path argument.")
+    if not os.path.isdir(args.target_path):
+        raise Exception(f"Invalid directory: {args.target_path}")
+    return args
+
+def update_options(args) -> dict:
+    return {
+        "extract_workers": args.workers,
+        "stream_install": args.stream_install,
+        "staged": args.staged,
+        "before_commit": lambda: kill_launcher(wait=True),
+        "store_size": args.store_size,
+        "version": args.version,
+        "repair": args.repair,
+        "base_url": args.base_url,
+        "mirrors": args.mirrors,
+        "trace": args.trace,
+        "profile": args.profile,
+        "trace_files": args.trace_files,
+    }
+
+def run_headless(argv) -> int:
+    try:
+        args = check_args(argv)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if not args.staged:
+        kill_launcher()
+
+    result = []
+    core = UpdaterCore(
+        args.target_path,
+        status_callback=lambda text: print(text, flush=True),
+        finished_callback=lambda success, message: result.append((success, message)),
+        **update_options(args),
+    )
+    thread = threading.Thread(target=core.run, daemon=True)
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(0.5)
+    except KeyboardInterrupt:
+        print("Cancelling update...", file=sys.stderr, flush=True)
+        core.request_stop()
+        thread.join()
+        core.cleanup()
+        return 130
+    if not result:
+        print("Update cancelled.", file=sys.stderr)
+        return 1
+    success, message = result[0]
+    print(message if success else f"Update failed: {message}", file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
\ No newline at end of file
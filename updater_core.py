@@ -0,0 +1,750 @@
+import os
+import time
+import urllib.request
+import urllib.error
+import zipfile
+import shutil
+import hashlib
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from update_manifest import fetch_manifest, resolve_url
+from segmented_downloader import SegmentedDownloader, RangesIgnored
+from install_index import InstallIndex
+from parallel_extractor import ParallelExtractor
+from streaming_installer import StreamingInstaller, RangesNotSupported
+from binary_patch import apply_patch, supported_formats, PatchError
+from staged_install import StagedInstall
+from content_store import ContentStore
+from progress_reporter import ProgressReporter
+from install_marker import InstallMarker
+from mirror_pool import MirrorPool
+from file_io import file_crc32, file_sha256, is_inside, replace_file, IoTimer
+from tar_installer import TarStreamInstaller, ArchiveNotAvailable, ArchiveCorrupt
+import update_trace
+
+class ChecksumMismatch(Exception):
+    pass
+
+class UpdaterCore:
+    PRESERVE_FOLDERS = {"Data", "CustomAssets", "CachingFolder"} # we don't want our data wiped :(
+    BASE_URL = "https://legacyplay.retify.lol"
+    MIRROR_URLS = ()
+    DELTA_CONNECTIONS = 4
+    MAX_RETRIES = 4
+    RETRY_DELAY = 1.0
+    DOWNLOAD_CONNECTIONS = 8
+    KEEP_FILES = {InstallIndex.FILE_NAME, StagedInstall.JOURNAL_NAME, InstallMarker.FILE_NAME}
+
+    def __init__(self, target_path, extract_workers=None, stream_install=True, staged=False, before_commit=None,
+                 store_size=0, version=None, repair=False, base_url=None, mirrors=None, trace=True, profile=False,
+                 trace_files=False, status_callback=None, progress_callback=None, phase_callback=None, finished_callback=None) -> None:
+        self.status_callback = status_callback or (lambda text: None)
+        self.progress_callback = progress_callback or (lambda percent: None)
+        self.phase_callback = phase_callback or (lambda phase: None)
+        self.finished_callback = finished_callback or (lambda success, message: None)
+        if base_url:
+            self.BASE_URL = base_url.rstrip('/')
+        self.target_path = target_path
+        self.output_path = target_path
+        self.extract_workers = extract_workers
+        self.stream_install = stream_install
+        self.staged = staged
+        self.staging = None
+        self.before_commit = before_commit
+        self.before_commit_called = False
+        self.requested_version = version
+        self.repair = repair
+        self.trace = trace
+        self.profile = profile
+        self.trace_files = trace_files
+        self.store = None
+        if store_size:
+            try:
+                self.store = ContentStore(ContentStore.default_root(), store_size * 1024 * 1024)
+            except OSError:
+                pass
+        self.stop_requested = False
+        self.temp_dir = os.path.join(os.environ.get('TEMP') or tempfile.gettempdir(), 'LP_Upd')
+        os.makedirs(self.temp_dir, exist_ok=True)
+        self.zip_path = ""
+        self.reporter = ProgressReporter(self.on_progress_info, self.on_phase)
+        self.install_index = None
+        self.new_index = None
+        self.hash_cache = {}
+        self.marker = InstallMarker.load(target_path)
+        self.mirrors = MirrorPool([self.BASE_URL, *self.MIRROR_URLS, *(mirrors or ())])
+        self.connection = self.mirrors.mirrors[0].connection
+        self.entry_failover = self.mirrors.failover(dict.fromkeys(self.mirrors.mirrors), self.RETRY_DELAY, self.MAX_RETRIES)
+        self.patch_failover = self.mirrors.failover(dict.fromkeys(self.mirrors.mirrors), self.RETRY_DELAY, self.MAX_RETRIES) # a mirror without patches may still serve files
+        self.version_etag = None
+        self.version_last_modified = None
+
+    def run(self) -> None:
+        trace = update_trace.begin(self.trace, self.profile, self.trace_files)
+        trace.set_info(staged=self.staged, stream_install=self.stream_install, repair=self.repair,
+                       mirrors=[mirror.base_url for mirror in self.mirrors.mirrors])
+        trace.start_profile()
+        result = None
+        try:
+            with trace.span("update"):
+                result = self.run_update()
+        except Exception as e:
+            trace.record_error(e)
+            self.cleanup()
+            result = (False, str(e))
+        finally:
+            trace.stop_profile()
+            trace_path = trace.save()
+        if result is None:
+            return
+        success, message = result
+        if not success and trace_path:
+            message += f"\n\nTrace saved to: {trace_path}"
+        self.finished_callback(success, message)
+
+    def run_update(self) -> tuple[bool, str] | None:
+        StagedInstall.recover(self.target_path)
+        self.reporter.start_phase("version")
+        self.status_callback("Fetching version info...")
+        version = self.requested_version or self.get_online_version()
+        if not version:
+            raise Exception("Failed to retrieve version info.")
+        update_trace.tracer.set_info(version=version)
+        if self.is_up_to_date(version):
+            self.reporter.start_phase("up-to-date")
+            self.progress_callback(100)
+            self.cleanup()
+            return True, f"Version {version} is already installed."
+        InstallMarker.remove(self.target_path)
+        self.status_callback(f"Preparing update {version}...")
+        self.prepare_output()
+        manifest = fetch_manifest(self.BASE_URL, version, self.store, self.connection)
+        if manifest:
+            self.delta_update(manifest)
+            if self.stop_requested:
+                self.cleanup()
+                return
+        else:
+            self.zip_path = os.path.join(self.temp_dir, f'update_{version}.zip')
+            self.remove_stale_downloads()
+            if self.stream_install and (self.stream_tar(version) or self.stream_zip(version)):
+                if self.stop_requested:
+                    self.cleanup()
+                    return
+            else:
+                self.status_callback("Downloading update...")
+                self.download_zip(version)
+                if self.stop_requested:
+                    self.cleanup()
+                    return
+                self.reporter.start_phase("extract")
+                self.status_callback("Extracting files...")
+                self.extract_zip()
+        self.write_marker(version)
+        self.cleanup()
+        return True, f"Update {version} completed."
+
+    def get_online_version(self):
+        with update_trace.span("fetch_version"):
+            headers = {}
+            if self.marker is not None:
+                if self.marker.etag:
+                    headers["If-None-Match"] = self.marker.etag
+                if self.marker.last_modified:
+                    headers["If-Modified-Since"] = self.marker.last_modified
+            try:
+                mirror, status, response_headers, body = self.mirrors.race("/current_ver.txt", headers)
+                self.BASE_URL = mirror.base_url # the quickest mirror to answer serves the manifest and patches
+                self.connection = mirror.connection
+                update_trace.tracer.set_info(mirror=mirror.base_url)
+                if status == 304 and self.marker is not None:
+                    self.version_etag = self.marker.etag
+                    self.version_last_modified = self.marker.last_modified
+                    return self.marker.version
+                if status != 200:
+                    return None
+                self.version_etag = response_headers.get('ETag')
+                self.version_last_modified = response_headers.get('Last-Modified')
+                return body.decode('utf-8').strip()
+            except:
+                return None
+
+    def is_up_to_date(self, version) -> bool:
+        if self.repair or self.marker is None or self.marker.version != version:
+            return False
+        index = InstallIndex.load(self.target_path)
+        return index.fingerprint() == self.marker.fingerprint and index.verify()
+
+    def write_marker(self, version) -> None:
+        if self.stop_requested or self.new_index is None:
+            return
+        InstallMarker(
+            self.target_path,
+            version,
+            self.new_index.fingerprint(),
+            self.version_etag,
+            self.version_last_modified,
+        ).save()
+
+    def download_zip(self, version) -> None:
+        self.reporter.start_phase("download")
+        downloader = SegmentedDownloader(
+            f"/zips/{version}.zip",
+            self.zip_path,
+            connections=self.DOWNLOAD_CONNECTIONS,
+            progress_callback=self.on_download_progress,
+            stop_check=lambda: self.stop_requested,
+            mirrors=self.mirrors,
+        )
+        try:
+            downloader.download()
+            if self.stop_requested:
+                return
+            self.reporter.flush()
+            if not downloader.total_size:
+                self.progress_callback(100)
+        except urllib.error.HTTPError as e:
+            raise Exception(f"HTTP error: {e.code}")
+        except urllib.error.URLError:
+            raise Exception("Failed to download update.")
+
+    def on_download_progress(self, downloaded, total_size) -> None:
+        self.reporter.update(downloaded, total_size)
+
+    def install_phase(self) -> str:
+        return "download" if self.staging is not None else "install" # "install" downloads straight into the live files
+
+    def on_phase(self, phase) -> None:
+        update_trace.tracer.begin_phase(phase)
+        self.phase_callback(phase)
+
+    def on_progress_info(self, info) -> None:
+        if info.phase == "check":
+            self.progress_callback(info.percent)
+            self.status_callback(f"Checking installed files: {info.done} / {info.total}")
+        elif info.phase == "extract":
+            self.progress_callback(info.percent)
+            self.status_callback(f"Extracting: {info.done} / {info.total} files")
+        elif info.phase in ("download", "install") and info.total:
+            self.progress_callback(info.percent)
+            mb_text = f"Downloading: {info.done // (1024*1024)} MB / {info.total // (1024*1024)} MB"
+            if info.rate:
+                mb_text += f" ({info.rate / (1024*1024):.1f} MB/s"
+                if info.eta is not None:
+                    minutes, seconds = divmod(int(info.eta), 60)
+                    mb_text += f", {minutes}:{seconds:02d} left"
+                mb_text += ")"
+            self.status_callback(mb_text)
+
+    def stream_tar(self, version) -> bool:
+        if not TarStreamInstaller.supported():
+            return False
+        if self.repair or not self.is_empty_install():
+            return False # the zip paths fetch and rewrite only changed files, the tar stream always carries everything
+        installer = TarStreamInstaller(
+            f"/archives/{version}.tar.zst",
+            self.target_path,
+            is_current=self.is_tar_member_current,
+            on_installed=lambda name, target_file, crc32: self.record_installed(name, target_file, crc32=crc32),
+            stop_check=lambda: self.stop_requested,
+            progress_callback=self.on_download_progress,
+            output_path=self.output_path,
+            mirrors=self.mirrors,
+        )
+        try:
+            self.load_install_index()
+            self.status_callback("Downloading update...")
+            self.reporter.start_phase(self.install_phase())
+            names = installer.run()
+        except ArchiveNotAvailable:
+            return False
+        except (ArchiveCorrupt, urllib.error.URLError, OSError):
+            if self.stop_requested:
+                return True
+            self.status_callback("Archive stream failed, falling back to ZIP download...")
+            return False
+        if self.stop_requested:
+            return True
+        self.reporter.flush()
+        self.progress_callback(100)
+        self.finish_install(self.archive_paths(names))
+        return True
+
+    def is_empty_install(self) -> bool:
+        try:
+            with os.scandir(self.target_path) as it:
+                return all(entry.name in self.PRESERVE_FOLDERS or entry.name in self.KEEP_FILES for entry in it)
+        except OSError:
+            return True
+
+    def stream_zip(self, version) -> bool:
+        installer = StreamingInstaller(
+            f"/zips/{version}.zip",
+            self.target_path,
+            workers=self.DOWNLOAD_CONNECTIONS,
+            is_current=self.is_zip_entry_current,
+            on_installed=lambda file, target_file: self.record_installed(file.filename, target_file, crc32=file.CRC),
+            stop_check=lambda: self.stop_requested,
+            progress_callback=self.on_download_progress,
+            output_path=self.output_path,
+            mirrors=self.mirrors,
+        )
+        try:
+            self.status_callback("Reading update contents...")
+            files = installer.open()
+            self.load_install_index()
+            self.status_callback("Downloading update...")
+            self.reporter.start_phase(self.install_phase())
+            installer.run(files)
+        except RangesNotSupported:
+            return False
+        except zipfile.BadZipFile:
+            raise Exception("Downloaded file is not a valid ZIP archive.")
+        except urllib.error.HTTPError as e:
+            raise Exception(f"HTTP error: {e.code}")
+        except urllib.error.URLError:
+            raise Exception("Failed to download update.")
+        if self.stop_requested:
+            return True
+        self.reporter.flush()
+        self.progress_callback(100)
+        self.finish_install(self.archive_paths(file.filename for file in files))
+        return True
+
+    def archive_paths(self, names) -> set:
+        expected_paths = set()
+        for path in names:
+            if path.endswith('/'):
+                path = path.rstrip('/')
+            if path:
+                parts = path.split('/')
+                expected_paths.add(path)
+                for idx in range(1, len(parts)):
+                    parent_path = '/'.join(parts[:idx])
+                    expected_paths.add(parent_path)
+        return expected_paths
+
+    def delta_update(self, manifest) -> None:
+        for entry in manifest.entries:
+            if not is_inside(self.target_path, entry.path):
+                raise Exception(f"Unsafe path in update manifest: {entry.path}")
+        self.status_callback("Checking installed files...")
+        self.load_install_index()
+        pending = []
+        self.reporter.start_phase("check", len(manifest.entries))
+        for entry in manifest.entries:
+            if self.stop_requested:
+                return
+            target_file = os.path.join(self.target_path, entry.path)
+            if self.is_file_current(target_file, entry):
+                self.record_installed(entry.path, target_file, sha256=entry.sha256)
+            elif self.store is not None and self.store.contains(entry.sha256):
+                pending.append((entry, None))
+            else:
+                pending.append((entry, self.select_patch(target_file, entry)))
+            self.reporter.advance(1)
+        if pending:
+            self.status_callback(f"Downloading {len(pending)} changed files...")
+            self.reporter.start_phase(self.install_phase(), sum(self.planned_transfer(entry, patch) for entry, patch in pending))
+            pool = ThreadPoolExecutor(max_workers=self.DELTA_CONNECTIONS)
+            try:
+                futures = [pool.submit(self.download_entry, manifest, entry, patch) for entry, patch in pending]
+                for future in as_completed(futures):
+                    future.result()
+            except Exception:
+                self.stop_requested = True
+                raise
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+            if self.stop_requested:
+                return
+            self.reporter.flush()
+        self.progress_callback(100)
+        self.finish_install(manifest.expected_paths())
+
+    def planned_transfer(self, entry, patch) -> int:
+        if self.store is not None and self.store.contains(entry.sha256):
+            return 0
+        return patch.size if patch else entry.transfer_size
+
+    def prepare_output(self) -> None:
+        if not self.staged:
+            return
+        staging = StagedInstall(self.target_path)
+        try:
+            staging.prepare()
+        except OSError:
+            self.run_before_commit() # staging directory not writable next to the install, update in place
+            return
+        self.staging = staging
+        self.output_path = staging.staging_path
+
+    def run_before_commit(self) -> None:
+        if self.before_commit is not None and not self.before_commit_called:
+            self.before_commit()
+        self.before_commit_called = True
+
+    def finish_install(self, expected_paths) -> None:
+        if self.staging is not None:
+            self.reporter.start_phase("commit")
+            self.status_callback("Applying update...")
+            self.staging.commit(self.run_before_commit)
+            self.staging = None
+            self.output_path = self.target_path
+        self.reporter.start_phase("cleanup")
+        self.status_callback("Cleaning up old files and directories...")
+        self.cleanup_old_files(expected_paths, self.install_index.paths())
+        if not self.stop_requested:
+            self.new_index.save()
+
+    def load_install_index(self) -> None:
+        self.install_index = InstallIndex(self.target_path) if self.repair else InstallIndex.load(self.target_path)
+        self.new_index = InstallIndex(self.target_path)
+
+    def record_installed(self, rel_path, target_file, crc32=None, sha256=None) -> None:
+        try:
+            st = os.stat(target_file)
+        except OSError:
+            return
+        cached = self.install_index.lookup(rel_path, st)
+        if cached is not None:
+            crc32 = crc32 if crc32 is not None else cached.crc32
+            sha256 = sha256 or cached.sha256
+        self.new_index.record(rel_path, st, crc32, sha256)
+
+    def installed_sha256(self, rel_path, target_file, st) -> str | None:
+        cached = self.install_index.lookup(rel_path, st)
+        if cached is not None and cached.sha256 is not None:
+            return cached.sha256
+        key = (rel_path, st.st_size, st.st_mtime_ns)
+        if key not in self.hash_cache:
+            self.hash_cache[key] = self.compute_sha256_file(target_file)
+        return self.hash_cache[key]
+
+    def is_file_current(self, target_file, entry) -> bool:
+        with update_trace.span("verify_file", "file", path=entry.path):
+            try:
+                st = os.stat(target_file)
+            except OSError:
+                return False
+            if st.st_size != entry.size:
+                return False
+            return self.installed_sha256(entry.path, target_file, st) == entry.sha256
+
+    def select_patch(self, target_file, entry):
+        if not entry.patches:
+            return None
+        try:
+            st = os.stat(target_file)
+        except OSError:
+            return None
+        return entry.find_patch(self.installed_sha256(entry.path, target_file, st), supported_formats())
+
+    def is_zip_entry_current(self, target_file, file) -> bool:
+        with update_trace.span("verify_file", "file", path=file.filename):
+            try:
+                st = os.stat(target_file)
+            except OSError:
+                return False
+            if st.st_size != file.file_size:
+                return False
+            cached = self.install_index.lookup(file.filename, st)
+            if cached is not None and cached.crc32 is not None:
+                return cached.crc32 == file.CRC
+            return self.compute_crc32_file(target_file) == file.CRC
+
+    def is_tar_member_current(self, target_file, size, crc32) -> bool:
+        try:
+            st = os.stat(target_file)
+        except OSError:
+            return False
+        if st.st_size != size:
+            return False
+        return self.compute_crc32_file(target_file) == crc32
+
+    def download_entry(self, manifest, entry, patch=None) -> None:
+        with update_trace.span("download_file", "file", path=entry.path):
+            if self.stop_requested:
+                return
+            if self.store is not None:
+                self.preserve_installed(entry)
+                if self.restore_from_store(entry):
+                    return
+            if patch is not None:
+                if self.patch_entry(entry, patch):
+                    return
+                self.reporter.add_total(entry.transfer_size)
+            if entry.url is None and entry.compression not in (zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED):
+                raise Exception(f"Unsupported compression for {entry.path}.")
+            os.makedirs(os.path.dirname(os.path.join(self.output_path, entry.path)), exist_ok=True)
+            try:
+                self.entry_failover.run(lambda mirror: self.fetch_entry(manifest, entry, mirror), None, lambda: self.stop_requested,
+                                        lambda: f"Downloading {entry.path}", (ChecksumMismatch, RangesIgnored))
+            except urllib.error.HTTPError as e:
+                raise Exception(f"HTTP error: {e.code}")
+
+    def fetch_entry(self, manifest, entry, mirror) -> None:
+        target_file = os.path.join(self.output_path, entry.path)
+        temp_file = target_file + ".lpupd"
+        decompressor = None
+        if entry.url:
+            request = urllib.request.Request(manifest.entry_url(mirror.base_url, entry))
+        else:
+            if entry.compression == zipfile.ZIP_DEFLATED:
+                decompressor = zlib.decompressobj(-15)
+            end = entry.offset + entry.compressed_size - 1
+            request = urllib.request.Request(manifest.archive_url(mirror.base_url), headers={"Range": f"bytes={entry.offset}-{end}"})
+        h = hashlib.sha256()
+        timer = IoTimer()
+        received = 0
+        try:
+            with urllib.request.urlopen(request, timeout=self.mirrors.transfer_timeout) as response, open(temp_file, 'wb') as f:
+                if entry.url is None and response.status != 206:
+                    raise RangesIgnored()
+                while True:
+                    if self.stop_requested:
+                        return
+                    chunk = response.read(65536)
+                    if not chunk:
+                        break
+                    received += len(chunk)
+                    self.reporter.advance(len(chunk))
+                    update_trace.count("download_bytes", len(chunk))
+                    if decompressor is not None:
+                        chunk = decompressor.decompress(chunk)
+                    timer.update(h, chunk)
+                    timer.write(f, chunk)
+                if received < entry.transfer_size:
+                    raise ConnectionError(f"Connection closed before {entry.path} was complete.") # retried, not reported as a checksum mismatch
+                if decompressor is not None:
+                    chunk = decompressor.flush()
+                    timer.update(h, chunk)
+                    timer.write(f, chunk)
+            timer.flush()
+            if h.hexdigest() != entry.sha256:
+                raise ChecksumMismatch(f"Checksum mismatch for {entry.path}.")
+            replace_file(temp_file, target_file, entry.path)
+            self.record_installed(entry.path, target_file, sha256=entry.sha256)
+            if self.store is not None:
+                self.store.put_file(entry.sha256, target_file)
+        except BaseException:
+            self.reporter.add_total(received) # the attempt's bytes were sent again, or not at all
+            raise
+        finally:
+            if os.path.exists(temp_file):
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+
+    def preserve_installed(self, entry) -> None:
+        live_file = os.path.join(self.target_path, entry.path)
+        try:
+            st = os.stat(live_file)
+        except OSError:
+            return
+        self.store.put_file(self.installed_sha256(entry.path, live_file, st), live_file)
+
+    def restore_from_store(self, entry) -> bool:
+        target_file = os.path.join(self.output_path, entry.path)
+        temp_file = target_file + ".lpupd"
+        os.makedirs(os.path.dirname(target_file), exist_ok=True)
+        try:
+            if not self.store.get(entry.sha256, temp_file):
+                return False
+            replace_file(temp_file, target_file, entry.path)
+            self.record_installed(entry.path, target_file, sha256=entry.sha256)
+            return True
+        finally:
+            if os.path.exists(temp_file):
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+
+    def patch_entry(self, entry, patch) -> bool:
+        base_file = os.path.join(self.target_path, entry.path)
+        target_file = os.path.join(self.output_path, entry.path)
+        patch_file = target_file + ".lppatch"
+        temp_file = target_file + ".lpupd"
+        os.makedirs(os.path.dirname(target_file), exist_ok=True)
+        timer = IoTimer()
+        try:
+            try:
+                self.patch_failover.run(lambda mirror: self.fetch_patch(entry, patch, patch_file, mirror, timer), None,
+                                        lambda: self.stop_requested, lambda: f"Downloading the patch for {entry.path}")
+            except Exception:
+                return False # fall back to the whole file
+            if self.stop_requested:
+                return True
+            start = time.perf_counter()
+            apply_patch(patch.format, base_file, patch_file, temp_file)
+            timer.writing += time.perf_counter() - start
+            timer.flush()
+            if self.compute_sha256_file(temp_file) != entry.sha256:
+                return False
+            replace_file(temp_file, target_file, entry.path)
+            self.record_installed(entry.path, target_file, sha256=entry.sha256)
+            if self.store is not None:
+                self.store.put_file(entry.sha256, target_file)
+            return True
+        except (PatchError, urllib.error.URLError, OSError):
+            return False
+        finally:
+            for path in (patch_file, temp_file):
+                if os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def fetch_patch(self, entry, patch, patch_file, mirror, timer) -> None:
+        received = 0
+        try:
+            with urllib.request.urlopen(resolve_url(mirror.base_url, patch.url), timeout=self.mirrors.transfer_timeout) as response, open(patch_file, 'wb') as f:
+                while True:
+                    if self.stop_requested:
+                        return
+                    chunk = response.read(65536)
+                    if not chunk:
+                        break
+                    received += len(chunk)
+                    self.reporter.advance(len(chunk))
+                    update_trace.count("download_bytes", len(chunk))
+                    timer.write(f, chunk)
+            if received < patch.size:
+                raise ConnectionError(f"Connection closed before the patch for {entry.path} was complete.")
+        except BaseException:
+            self.reporter.add_total(received)
+            raise
+
+    def extract_zip(self) -> None:
+        try:
+            self.load_install_index()
+            with zipfile.ZipFile(self.zip_path) as zip_ref:
+                files = zip_ref.infolist()
+            expected_paths = self.archive_paths(file.filename for file in files)
+            extractor = ParallelExtractor(
+                self.zip_path,
+                self.target_path,
+                workers=self.extract_workers,
+                is_current=self.is_zip_entry_current,
+                on_installed=lambda file, target_file: self.record_installed(file.filename, target_file, crc32=file.CRC),
+                stop_check=lambda: self.stop_requested,
+                progress_callback=self.on_extract_progress,
+                output_path=self.output_path,
+            )
+            extractor.run(files)
+            if self.stop_requested:
+                return
+            self.reporter.flush()
+            self.finish_install(expected_paths)
+        except zipfile.BadZipFile:
+            raise Exception("Downloaded file is not a valid ZIP archive.")
+        except PermissionError:
+            raise Exception("Access denied while extracting files.")
+        except Exception as e:
+            raise Exception(f"Failed to extract files: {e}")
+
+    def on_extract_progress(self, completed, total_files) -> None:
+        self.reporter.update(completed, total_files)
+
+    def cleanup_old_files(self, expected_paths, previous_paths=None) -> None:
+        with update_trace.span("cleanup_old_files"):
+            if previous_paths:
+                self.remove_listed_files(previous_paths - expected_paths, expected_paths)
+            else:
+                self.remove_unexpected(self.target_path, '', expected_paths)
+
+    def remove_listed_files(self, rel_paths, expected_paths) -> None:
+        directories = set()
+        for rel_path in rel_paths:
+            if self.stop_requested:
+                return
+            if rel_path.split('/', 1)[0] in self.PRESERVE_FOLDERS:
+                continue
+            try:
+                os.remove(os.path.join(self.target_path, rel_path))
+                update_trace.count("files_removed")
+            except OSError:
+                pass
+            parent = rel_path.rpartition('/')[0]
+            while parent and parent not in expected_paths and parent not in directories:
+                directories.add(parent)
+                parent = parent.rpartition('/')[0]
+        for directory in sorted(directories, key=len, reverse=True):
+            try:
+                os.rmdir(os.path.join(self.target_path, directory))
+            except OSError:
+                pass
+
+    def remove_unexpected(self, path, prefix, expected_paths) -> None:
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            return
+        for entry in entries:
+            if self.stop_requested:
+                return
+            rel_path = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if not prefix and entry.name in self.PRESERVE_FOLDERS:
+                    continue
+                if rel_path in expected_paths:
+                    self.remove_unexpected(entry.path, rel_path + '/', expected_paths)
+                else:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    update_trace.count("directories_removed")
+            elif rel_path not in expected_paths and rel_path not in self.KEEP_FILES:
+                try:
+                    os.remove(entry.path)
+                    update_trace.count("files_removed")
+                except OSError:
+                    pass
+
+    def compute_crc32_file(self, path) -> int | None:
+        try:
+            return file_crc32(path)
+        except:
+            return None
+
+    def compute_sha256_file(self, path) -> str | None:
+        try:
+            return file_sha256(path)
+        except:
+            return None
+
+    def remove_stale_downloads(self) -> None:
+        try:
+            names = os.listdir(self.temp_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.temp_dir, name)
+            if name.startswith('update_') and not path.startswith(self.zip_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def cleanup(self) -> None:
+        self.mirrors.close()
+        if self.staging is not None:
+            self.staging.discard()
+        if self.store is not None:
+            self.store.evict()
+        try:
+            if self.zip_path and os.path.exists(self.zip_path + SegmentedDownloader.STATE_SUFFIX):
+                return # keep the partial download so the next run can resume it
+            if os.path.exists(self.zip_path):
+                os.remove(self.zip_path)
+            if os.path.isdir(self.temp_dir):
+                shutil.rmtree(self.temp_dir, ignore_errors=True)
+        except:
+            pass
+
+    def request_stop(self) -> None:
+        self.stop_requested = True
\ No newline at end of file
@@ -8,9 +8,12 @@ from PySide6.QtGui import QFont, QIcon
 from updater_worker import UpdaterWorker
 
 class UpdaterDialog(QDialog):
-    def __init__(self, target_path) -> None:
+    LAUNCH_DELAY = 2000
+
+    def __init__(self, target_path, **worker_options) -> None:
         super().__init__()
         self.target_path = target_path
+        self.staged = worker_options.get("staged", False)
         self.setWindowTitle("LegacyPlay Updater")
         self.setFixedSize(500, 220)
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
@@ -55,24 +58,24 @@ class UpdaterDialog(QDialog):
         self.setLayout(layout)
 
         self.closing_enabled = True
+        self.launch_delay = self.LAUNCH_DELAY
 
         self.thread = QThread(self)
-        self.worker = UpdaterWorker(target_path)
+        self.worker = UpdaterWorker(target_path, **worker_options)
         self.setWindowIcon(QIcon(self.worker.icon_path))
         self.worker.moveToThread(self.thread)
         self.worker.status.connect(self.label.setText)
         self.worker.progress.connect(self.progress.setValue)
         self.worker.finished.connect(self.on_finished)
-        self.worker.status.connect(self.check_status_for_extraction)
+        self.worker.phase.connect(self.on_phase_changed)
         self.thread.started.connect(self.worker.run)
         self.thread.finished.connect(self.thread.deleteLater)
         self.thread.start()
 
-    def check_status_for_extraction(self, status_text) -> None:
-        if "Extracting" in status_text:
-            self.set_cancel_visible(False)
-        else:
-            self.set_cancel_visible(True)
+    def on_phase_changed(self, phase) -> None:
+        if phase == "up-to-date":
+            self.launch_delay = 0
+        self.set_cancel_visible(phase not in ("extract", "install", "commit")) # live files are being replaced
 
     def set_cancel_visible(self, visible) -> None:
         self.cancel_button.setVisible(visible)
@@ -101,16 +104,24 @@ class UpdaterDialog(QDialog):
             self.thread.wait()
         self.thread = None
         self.set_cancel_visible(True)
-        if success:
-            self.label.setText(message)
+        if success and not self.launcher_stopped():
+            self.label.setText(message) # the launcher was never closed, so it is still running
+            self.cancel_button.setText("Close")
+            self.cancel_button.setEnabled(True)
+            QTimer.singleShot(self.launch_delay, self.close)
+        elif success:
+            self.label.setText(f"{message} Launching...")
             self.cancel_button.setText("Launching...")
             self.cancel_button.setEnabled(False)
-            QTimer.singleShot(2000, self.launch_and_exit)
+            QTimer.singleShot(self.launch_delay, self.launch_and_exit)
         else:
             self.cancel_button.setText("Close")
             self.cancel_button.setEnabled(True)
             QMessageBox.critical(self, "Update Failed", message)
 
+    def launcher_stopped(self) -> bool:
+        return not self.staged or self.worker.core.before_commit_called
+
     def launch_and_exit(self) -> None:
         launcher_path = os.path.join(self.target_path, "LegacyPlay_Launcher.exe")
         if os.path.exists(launcher_path):